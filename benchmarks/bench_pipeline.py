@@ -0,0 +1,187 @@
+# benchmarks/bench_pipeline.py
+"""
+Timing and peak-memory benchmarks for the calc/nodes pipeline.
+
+    python -m benchmarks.bench_pipeline --out bench.json
+    python -m benchmarks.bench_pipeline --compare bench.json --threshold 0.10
+
+Each stage is timed separately on seeded synthetic chains. Results are
+keyed "<stage>/<contracts>" so two runs can be compared; a comparison exits
+non-zero when any median time or peak memory grows past the threshold.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.synthetic import expiration_date, synthetic_payload
+from core.calc import compute_exposure, smooth_profile
+from core.chain import OptionChain
+from core.data import parse_chain
+from core.nodes import extract_nodes
+
+SIZES = (100, 1_000, 10_000, 100_000)
+STAGES = ("compute_exposure", "smooth_profile", "extract_nodes", "build_nodes", "build_nodes_memoized")
+SPOT = 5000.0
+EXPIRATION = expiration_date(1)  # the synthetic chain's nearest expiration
+
+
+def _measure(fn: Callable[[], object], min_time: float, min_calls: int = 3) -> Dict[str, float]:
+    fn()  # warm-up
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < min_calls or time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+
+    # Peak memory from a separate call so tracing does not skew the timings
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "calls": len(samples),
+        "median_s": statistics.median(samples),
+        "best_s": min(samples),
+        "mean_s": statistics.fmean(samples),
+        "peak_bytes": max(peak, 0),
+    }
+
+
+def _stub_build_nodes(payload: bytes, memoized: bool = False):
+    """
+    build_nodes with spot, expirations and the chain served from memory;
+    a full recompute unless `memoized` (an unchanged chain hitting MEMO).
+    """
+    import gammamaps_service as svc
+
+    def run():
+        if not memoized:
+            svc.MEMO.clear()
+        saved = svc.get_spot, svc.get_expirations, svc.get_options_chain
+        svc.get_spot = lambda symbol: SPOT
+        svc.get_expirations = lambda symbol: [EXPIRATION]
+        svc.get_options_chain = lambda symbol, exp: parse_chain(symbol, payload, exp)
+        try:
+            return svc.build_nodes(f"BENCH{len(payload)}", EXPIRATION)
+        finally:
+            svc.get_spot, svc.get_expirations, svc.get_options_chain = saved
+
+    return run
+
+
+def run_benchmarks(sizes=SIZES, stages=STAGES, seed: int = 0, window: float = 5,
+                   kernel: str = "box", by: str = "index", min_time: float = 0.5,
+                   log=print) -> Dict:
+    results = {}
+    for n in sizes:
+        payload = synthetic_payload(n, spot=SPOT, seed=seed)
+        chain = OptionChain.from_json(payload, expiration=EXPIRATION)
+        profile = compute_exposure(chain, SPOT)
+        smoothed = smooth_profile(profile, window=window, kernel=kernel, by=by)
+
+        calls = {
+            "compute_exposure": lambda: compute_exposure(chain, SPOT),
+            "smooth_profile": lambda: smooth_profile(profile, window=window, kernel=kernel, by=by),
+            "extract_nodes": lambda: extract_nodes(smoothed, SPOT, symbol=f"BENCH{n}",
+                                                   expiration=EXPIRATION),
+            "build_nodes": _stub_build_nodes(payload),
+            "build_nodes_memoized": _stub_build_nodes(payload, memoized=True),
+        }
+        for stage in stages:
+            r = _measure(calls[stage], min_time)
+            r["contracts"] = n
+            r["contracts_per_sec"] = n / r["median_s"] if r["median_s"] > 0 else 0.0
+            results[f"{stage}/{n}"] = r
+            log(f"{stage:>20} {n:>7}  {r['median_s'] * 1e3:9.3f} ms  "
+                f"{r['contracts_per_sec']:12,.0f} contracts/s  {r['peak_bytes'] / 1024:9.1f} KiB")
+
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "config": {"sizes": list(sizes), "stages": list(stages), "seed": seed,
+                   "window": window, "kernel": kernel, "by": by, "min_time": min_time},
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.10) -> List[Dict]:
+    """
+    Changes in median time and peak memory for every benchmark present in
+    both runs; entries growing by more than `threshold` (a fraction) are
+    marked as regressions.
+    """
+    rows = []
+    for key, cur in current["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        for metric in ("median_s", "peak_bytes"):
+            old, new = base[metric], cur[metric]
+            change = (new - old) / old if old else 0.0
+            rows.append({"benchmark": key, "metric": metric, "baseline": old, "current": new,
+                         "change": change, "regression": change > threshold})
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the calc/nodes pipeline")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma-separated contract counts")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated stages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--window", type=float, default=5)
+    parser.add_argument("--kernel", default="box")
+    parser.add_argument("--by", default="index")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per benchmark")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed fractional slowdown / memory growth")
+    args = parser.parse_args(argv)
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    current = run_benchmarks(sizes=[int(s) for s in args.sizes.split(",") if s], stages=stages,
+                             seed=args.seed, window=args.window, kernel=args.kernel, by=args.by,
+                             min_time=args.min_time)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    print()
+    for r in rows:
+        flag = "REGRESSION" if r["regression"] else ""
+        print(f"{r['benchmark']:>24} {r['metric']:>10}  {r['change']:+8.1%}  {flag}")
+    regressions = [r for r in rows if r["regression"]]
+    print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+# benchmarks/fake_tradier.py
+"""
+Local stand-in for the Tradier endpoints the service uses:
+/markets/quotes, /markets/options/expirations and /markets/options/chains.
+
+    python -m benchmarks.fake_tradier --port 8100 --latency-ms 80 --jitter-ms 40 \
+        --error-rate 0.01 --rate-limit 120
+    TRADIER_BASE=http://127.0.0.1:8100/v1 TRADIER_TOKEN=x uvicorn gammamaps_service:app
+
+Responses come from synthetic chains (benchmarks/synthetic.py) or from a
+directory of recorded bodies (see `record`). GET /_stats returns request
+counts per endpoint and status; POST /_reset clears them.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import synthetic_payload
+
+DEFAULT_SPOTS = {"SPX": 5000.0, "SPY": 500.0, "QQQ": 430.0, "IWM": 200.0, "GLD": 240.0}
+ENDPOINTS = {
+    "/markets/quotes": "quotes",
+    "/markets/options/expirations": "expirations",
+    "/markets/options/chains": "chains",
+}
+
+
+def _weekdays(n: int, start: datetime.date = None) -> List[str]:
+    day = start or datetime.date.today()
+    out = []
+    while len(out) < n:
+        if day.weekday() < 5:
+            out.append(day.isoformat())
+        day += datetime.timedelta(days=1)
+    return out
+
+
+class Fixtures:
+    """
+    Response bodies by endpoint. Synthetic by default; with `directory`,
+    recorded bodies are served from quotes/<SYM>.json,
+    expirations/<SYM>.json and chains/<SYM>_<EXP>.json, falling back to
+    synthetic data for anything not recorded.
+    """
+
+    def __init__(self, directory: Optional[str] = None, expirations: int = 8,
+                 contracts: int = 800, spots: Dict[str, float] = None):
+        self.directory = directory
+        self.n_expirations = expirations
+        self.contracts = contracts
+        self.spots = dict(DEFAULT_SPOTS if spots is None else spots)
+        self._chains: Dict[tuple, bytes] = {}
+        self._lock = threading.Lock()
+
+    def _recorded(self, kind: str, name: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, kind, f"{name}.json")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        return None
+
+    def quotes(self, symbols: List[str]) -> bytes:
+        quotes = []
+        for symbol in symbols:
+            recorded = self._recorded("quotes", symbol)
+            if recorded is not None:
+                quote = json.loads(recorded)["quotes"]["quote"]
+                quotes.extend(quote if isinstance(quote, list) else [quote])
+                continue
+            # Slow drift so repeated polls see spot move
+            spot = self.spots.get(symbol, 100.0) * (1.0 + 0.002 * random.uniform(-1, 1))
+            quotes.append({"symbol": symbol, "last": round(spot, 2), "close": round(spot, 2)})
+        return json.dumps({"quotes": {"quote": quotes[0] if len(quotes) == 1 else quotes}}).encode()
+
+    def expirations(self, symbol: str) -> bytes:
+        recorded = self._recorded("expirations", symbol)
+        if recorded is not None:
+            return recorded
+        return json.dumps({"expirations": {"date": _weekdays(self.n_expirations)}}).encode()
+
+    def chain(self, symbol: str, expiration: str) -> bytes:
+        recorded = self._recorded("chains", f"{symbol}_{expiration}")
+        if recorded is not None:
+            return recorded
+        key = (symbol, expiration)
+        with self._lock:
+            body = self._chains.get(key)
+            if body is None:
+                seed = zlib.crc32(f"{symbol}|{expiration}".encode())
+                body = self._chains[key] = synthetic_payload(
+                    self.contracts, spot=self.spots.get(symbol, 100.0), seed=seed
+                )
+        return body
+
+
+class FakeTradier:
+    """
+    Threaded HTTP server with injected latency, jitter, 5xx errors and a
+    token-bucket rate limit answered with 429 + Retry-After.
+    """
+
+    def __init__(self, fixtures: Fixtures = None, host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: float = 0.0, burst: Optional[float] = None):
+        self.fixtures = fixtures or Fixtures()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst if burst is not None else max(rate_limit, 1.0)
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+        handler = type("Handler", (_Handler,), {"fake": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeTradier":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _allow(self) -> bool:
+        if self.rate_limit <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    def _count(self, endpoint: str, status: int):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            per_endpoint = {e: dict(c) for e, c in self._counts.items()}
+        return {
+            "requests": sum(sum(c.values()) for c in per_endpoint.values()),
+            "endpoints": per_endpoint,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: FakeTradier = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if urlparse(self.path).path == "/_reset":
+            self.fake.reset()
+            return self._send(200, b"{}")
+        self._send(404, b'{"error": "not found"}')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/_stats":
+            return self._send(200, json.dumps(self.fake.stats()).encode())
+
+        path = url.path[3:] if url.path.startswith("/v1/") else url.path
+        endpoint = ENDPOINTS.get(path)
+        if endpoint is None:
+            return self._send(404, b'{"error": "not found"}')
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        fake = self.fake
+        delay = fake.latency_ms + random.uniform(-fake.jitter_ms, fake.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        if not fake._allow():
+            fake._count(endpoint, 429)
+            return self._send(429, b"Rate limit exceeded", {"Retry-After": "1"})
+        if fake.error_rate > 0 and random.random() < fake.error_rate:
+            fake._count(endpoint, 500)
+            return self._send(500, b'{"fault": "synthetic error"}')
+
+        try:
+            if endpoint == "quotes":
+                body = fake.fixtures.quotes([s.upper() for s in params.get("symbols", "").split(",") if s])
+            elif endpoint == "expirations":
+                body = fake.fixtures.expirations(params.get("symbol", "").upper())
+            else:
+                body = fake.fixtures.chain(params.get("symbol", "").upper(), params.get("expiration", ""))
+        except Exception as e:
+            fake._count(endpoint, 500)
+            return self._send(500, json.dumps({"fault": str(e)}).encode())
+        fake._count(endpoint, 200)
+        self._send(200, body)
+
+
+def record(directory: str, symbols: List[str], max_expirations: int = 8):
+    """Save real Tradier responses (needs TRADIER_TOKEN) as fixtures for --fixtures."""
+    from core.client import get_client
+    from core.data import TRADIER_BASE, tradier_headers
+
+    def fetch(path, params, kind, name):
+        resp = get_client().get(f"{TRADIER_BASE}{path}", headers=tradier_headers(),
+                                params=params, timeout=15)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Tradier API Error: {resp.text}")
+        os.makedirs(os.path.join(directory, kind), exist_ok=True)
+        with open(os.path.join(directory, kind, f"{name}.json"), "wb") as f:
+            f.write(resp.content)
+        return resp
+
+    for symbol in symbols:
+        fetch("/markets/quotes", {"symbols": symbol}, "quotes", symbol)
+        resp = fetch("/markets/options/expirations",
+                     {"symbol": symbol, "includeAllRoots": "true", "strikes": "false"},
+                     "expirations", symbol)
+        dates = (resp.json().get("expirations") or {}).get("date") or []
+        for exp in dates[:max_expirations]:
+            fetch("/markets/options/chains", {"symbol": symbol, "expiration": exp, "greeks": "true"},
+                  "chains", f"{symbol}_{exp}")
+        print(f"recorded {symbol}: {min(len(dates), max_expirations)} chains")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Tradier stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--fixtures", help="directory of recorded response bodies")
+    parser.add_argument("--expirations", type=int, default=8, help="synthetic expirations per symbol")
+    parser.add_argument("--contracts", type=int, default=800, help="synthetic contracts per chain")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered with 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/sec before 429 (0 = off)")
+    parser.add_argument("--burst", type=float, default=None, help="rate-limit bucket size")
+    parser.add_argument("--record", metavar="DIR", help="record real responses to DIR and exit")
+    parser.add_argument("--symbols", default="SPX", help="symbols to --record")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record(args.record, [s.strip().upper() for s in args.symbols.split(",") if s.strip()],
+               args.expirations)
+        return
+
+    fixtures = Fixtures(args.fixtures, expirations=args.expirations, contracts=args.contracts)
+    fake = FakeTradier(fixtures, host=args.host, port=args.port, latency_ms=args.latency_ms,
+                       jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                       rate_limit=args.rate_limit, burst=args.burst)
+    print(f"Fake Tradier on {fake.base_url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# benchmarks/loadgen.py
+"""
+Drive /nodes and /expirations with simulated dashboard clients.
+
+    python -m benchmarks.loadgen --target http://127.0.0.1:8000 \
+        --vendor http://127.0.0.1:8100 --rps 200 --clients 50 --duration 60
+
+Each client runs on its own keep-alive session, remembers ETags and sends
+If-None-Match the way the dashboard does. Requests follow a fixed
+schedule at the target rate, and latency is measured from the scheduled
+start, so a stalled server shows up in the percentiles instead of
+lowering the send rate. With --vendor pointing at benchmarks/fake_tradier.py,
+the report includes vendor calls per client request.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+
+SYMBOLS = ("SPX", "SPY", "QQQ", "IWM", "GLD")
+
+
+def _vendor_requests(vendor: Optional[str]) -> Optional[int]:
+    if not vendor:
+        return None
+    try:
+        return requests.get(f"{vendor.rstrip('/')}/_stats", timeout=5).json()["requests"]
+    except Exception:
+        return None
+
+
+class _Client(threading.Thread):
+    def __init__(self, gen: "LoadGenerator", index: int, start_at: float, interval: float):
+        super().__init__(name=f"client-{index}", daemon=True)
+        self.gen = gen
+        self.rng = random.Random(gen.seed * 1_000_003 + index)
+        self.session = requests.Session()
+        self.etags: Dict[str, str] = {}
+        self.next_at = start_at + self.rng.uniform(0, interval)
+        self.interval = interval
+        self.samples: List[tuple] = []   # (endpoint, latency_s, status or None)
+
+    def _request(self) -> tuple:
+        gen = self.gen
+        symbol = self.rng.choice(gen.symbols)
+        if self.rng.random() < gen.expirations_ratio:
+            endpoint, params = "/expirations", {"symbol": symbol}
+        else:
+            endpoint, params = "/nodes", {"symbol": symbol}
+        key = f"{endpoint}?{symbol}"
+        headers = {"Accept-Encoding": "gzip"}
+        if key in self.etags:
+            headers["If-None-Match"] = self.etags[key]
+        resp = self.session.get(gen.target + endpoint, params=params, headers=headers,
+                                timeout=gen.timeout)
+        if resp.status_code == 200 and "ETag" in resp.headers:
+            self.etags[key] = resp.headers["ETag"]
+        return endpoint, resp.status_code
+
+    def run(self):
+        end = self.gen.end_at
+        while self.next_at < end:
+            delay = self.next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            scheduled = self.next_at
+            self.next_at += self.interval
+            try:
+                endpoint, status = self._request()
+            except Exception:
+                endpoint, status = "error", None
+            self.samples.append((endpoint, time.perf_counter() - scheduled, status))
+        self.session.close()
+
+
+class LoadGenerator:
+    def __init__(self, target: str, rps: float = 50.0, clients: int = 20, duration: float = 30.0,
+                 symbols=SYMBOLS, expirations_ratio: float = 0.2, vendor: Optional[str] = None,
+                 timeout: float = 30.0, seed: int = 0):
+        self.target = target.rstrip("/")
+        self.rps = rps
+        self.clients = clients
+        self.duration = duration
+        self.symbols = list(symbols)
+        self.expirations_ratio = expirations_ratio
+        self.vendor = vendor
+        self.timeout = timeout
+        self.seed = seed
+        self.end_at = 0.0
+
+    def run(self) -> Dict:
+        vendor_before = _vendor_requests(self.vendor)
+        start = time.perf_counter()
+        self.end_at = start + self.duration
+        interval = self.clients / self.rps
+        workers = [_Client(self, i, start, interval) for i in range(self.clients)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+        vendor_after = _vendor_requests(self.vendor)
+
+        samples = [s for w in workers for s in w.samples]
+        report = summarize(samples, elapsed)
+        report["target_rps"] = self.rps
+        report["clients"] = self.clients
+        if vendor_before is not None and vendor_after is not None:
+            vendor_calls = vendor_after - vendor_before
+            report["vendor_calls"] = vendor_calls
+            report["vendor_calls_per_request"] = vendor_calls / max(len(samples), 1)
+        return report
+
+
+def _latency(latencies: np.ndarray) -> Dict[str, float]:
+    if len(latencies) == 0:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e3
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+            "max_ms": float(latencies.max() * 1e3)}
+
+
+def summarize(samples: List[tuple], elapsed: float) -> Dict:
+    """Latency percentiles, error rate and status counts, overall and per endpoint."""
+    def block(rows):
+        latencies = np.array([lat for _, lat, _ in rows], dtype=np.float64)
+        statuses: Dict[str, int] = {}
+        errors = 0
+        for _, _, status in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status is None or status >= 400:
+                errors += 1
+        return {
+            "requests": len(rows),
+            "error_rate": errors / len(rows) if rows else 0.0,
+            "statuses": statuses,
+            **_latency(latencies),
+        }
+
+    endpoints = sorted({e for e, _, _ in samples})
+    return {
+        "duration_s": elapsed,
+        "achieved_rps": len(samples) / elapsed if elapsed > 0 else 0.0,
+        **block(samples),
+        "endpoints": {e: block([s for s in samples if s[0] == e]) for e in endpoints},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the GammaMaps API")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="service base URL")
+    parser.add_argument("--vendor", help="fake Tradier base URL (for vendor call counts)")
+    parser.add_argument("--rps", type=float, default=50.0, help="total target requests/sec")
+    parser.add_argument("--clients", type=int, default=20, help="simulated dashboard clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--symbols", default=",".join(SYMBOLS))
+    parser.add_argument("--expirations-ratio", type=float, default=0.2,
+                        help="fraction of requests sent to /expirations")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the report JSON here")
+    args = parser.parse_args(argv)
+
+    gen = LoadGenerator(args.target, rps=args.rps, clients=args.clients, duration=args.duration,
+                        symbols=[s.strip().upper() for s in args.symbols.split(",") if s.strip()],
+                        expirations_ratio=args.expirations_ratio, vendor=args.vendor,
+                        timeout=args.timeout, seed=args.seed)
+    report = gen.run()
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/synthetic.py
+import datetime
+import json
+import math
+from typing import Dict, List
+
+import numpy as np
+
+from core.chain import OptionChain
+
+STRIKES_PER_EXPIRATION = 400   # chains larger than ~800 contracts span several expirations
+
+
+def strike_step(spot: float) -> float:
+    # Listed strike spacing scales with the underlying (5 for SPX, 1 for SPY)
+    return 5.0 if spot >= 1000 else 1.0 if spot >= 100 else 0.5
+
+
+def expiration_date(dte: float) -> str:
+    """YYYY-MM-DD date `dte` days from today, as the vendor labels expirations."""
+    return (datetime.date.today() + datetime.timedelta(days=math.ceil(dte))).isoformat()
+
+
+def _expiration_counts(n_contracts: int) -> List[int]:
+    # Strikes per expiration so that the total is n_contracts // 2 call/put pairs
+    pairs = max(n_contracts // 2, 1)
+    n_exp = max(1, math.ceil(pairs / STRIKES_PER_EXPIRATION))
+    base, extra = divmod(pairs, n_exp)
+    return [base + (i < extra) for i in range(n_exp)]
+
+
+def synthetic_options(n_contracts: int, spot: float = 5000.0, seed: int = 0) -> List[Dict]:
+    """
+    Seeded Tradier-style option dicts with a realistic shape:
+
+    - a strike_step(spot) grid centred on spot per expiration, expirations a few
+      days apart, so strikes repeat across expirations as in a full chain
+    - IV with put skew and smile, gamma from Black-Scholes
+    - OI concentrated near the money and on round strikes, heavier puts
+      below spot and calls above, with some zero-OI rows
+    """
+    rng = np.random.default_rng(seed)
+    step = strike_step(spot)
+    center = round(spot / step) * step
+    options = []
+    for i, count in enumerate(_expiration_counts(n_contracts)):
+        dte = 1.0 + 3.0 * i
+        t = dte / 365.0
+        # Shift the grid up rather than list strikes at or below zero
+        low = max(center - (count // 2) * step, step)
+        strikes = low + np.arange(count) * step
+
+        m = np.log(strikes / spot)
+        iv = np.clip(0.16 - 0.25 * m + 1.5 * m * m, 0.05, 2.0)
+        d1 = (-m + 0.5 * iv * iv * t) / (iv * math.sqrt(t))
+        gamma = np.exp(-0.5 * d1 * d1) / (math.sqrt(2.0 * math.pi) * spot * iv * math.sqrt(t))
+
+        width = 0.02 + 0.08 * math.sqrt(t)
+        base = rng.lognormal(mean=7.0, sigma=0.8, size=(2, count)) * np.exp(-np.abs(m) / width)
+        round_boost = np.where(strikes % 100 == 0, 3.0, np.where(strikes % 25 == 0, 1.5, 1.0))
+        call_oi = base[0] * round_boost * np.where(strikes >= spot, 1.0, 0.4)
+        put_oi = base[1] * round_boost * np.where(strikes <= spot, 1.6, 0.5)
+        call_oi[rng.random(count) < 0.1] = 0
+        put_oi[rng.random(count) < 0.1] = 0
+
+        exp = expiration_date(dte).replace("-", "")
+        for k, g, v, c_oi, p_oi in zip(strikes.tolist(), gamma.tolist(), iv.tolist(),
+                                       call_oi.astype(int).tolist(), put_oi.astype(int).tolist()):
+            for opt_type, oi in (("call", c_oi), ("put", p_oi)):
+                options.append({
+                    "symbol": f"SYN{exp}{opt_type[0].upper()}{int(k)}",
+                    "strike": k,
+                    "option_type": opt_type,
+                    "open_interest": oi,
+                    "bid": 1.0,
+                    "ask": 1.1,
+                    "greeks": {"gamma": g, "mid_iv": v, "smv_vol": v},
+                })
+    return options
+
+
+def synthetic_payload(n_contracts: int, spot: float = 5000.0, seed: int = 0) -> bytes:
+    """Raw /markets/options/chains response body for synthetic_options."""
+    return json.dumps({"options": {"option": synthetic_options(n_contracts, spot, seed)}}).encode()
+
+
+def synthetic_chain(n_contracts: int, spot: float = 5000.0, seed: int = 0,
+                    expiration: str = None) -> OptionChain:
+    return OptionChain.from_options(synthetic_options(n_contracts, spot, seed), expiration=expiration)
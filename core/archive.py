@@ -0,0 +1,214 @@
+# core/archive.py
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from core.chain import OptionChain
+
+CHAINS = "chains"
+PROFILES = "profiles"
+
+MARKET_TZ = ZoneInfo("America/New_York")
+
+# Hive partition layout: <root>/<kind>/symbol=SPX/date=2026-10-16/expiration=2026-10-16/
+PARTITIONING = ds.partitioning(
+    pa.schema([("symbol", pa.string()), ("date", pa.string()), ("expiration", pa.string())]),
+    flavor="hive",
+)
+
+SCHEMAS = {
+    CHAINS: pa.schema([
+        ("ts", pa.float64()),
+        ("spot", pa.float64()),
+        ("strike", pa.float64()),
+        ("is_put", pa.bool_()),
+        ("open_interest", pa.float64()),
+        ("gamma", pa.float64()),
+        ("iv", pa.float64()),
+        ("bid", pa.float64()),
+        ("ask", pa.float64()),
+    ]),
+    PROFILES: pa.schema([
+        ("ts", pa.float64()),
+        ("spot", pa.float64()),
+        ("strike", pa.float64()),
+        ("gex_raw", pa.float64()),
+        ("gex", pa.float64()),
+    ]),
+}
+
+
+def trade_date(ts: float) -> str:
+    """Exchange-local calendar date of a unix timestamp."""
+    return datetime.fromtimestamp(ts, MARKET_TZ).strftime("%Y-%m-%d")
+
+
+class SnapshotArchive:
+    """
+    Append-only Parquet archive of fetched chains and computed profiles.
+
+    add_chain / add_profile only enqueue column arrays; a background thread
+    groups them by partition and writes one Parquet file per partition per
+    flush (every `flush_interval` seconds or `batch_rows` rows). When the
+    queue is full new snapshots are dropped and counted rather than
+    blocking the caller.
+    """
+
+    def __init__(self, root: str, batch_rows: int = 200_000, flush_interval: float = 10.0,
+                 max_queue: int = 10_000):
+        self.root = root
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._seq = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.rows_written = 0
+        self.files_written = 0
+        self.write_errors = 0
+
+    # --- producer side (request path) ---
+    def add_chain(self, symbol: str, spot: float, chain: OptionChain, ts: Optional[float] = None):
+        ts = time.time() if ts is None else ts
+        self._put(CHAINS, symbol, chain.expiration or "", ts, spot, {
+            "strike": chain.strike,
+            "is_put": chain.is_put,
+            "open_interest": chain.open_interest,
+            "gamma": chain.gamma,
+            "iv": chain.iv,
+            "bid": chain.bid,
+            "ask": chain.ask,
+        })
+
+    def add_profile(self, symbol: str, expiration: str, spot: float, strikes: np.ndarray,
+                    gex_raw: np.ndarray, gex: np.ndarray, ts: Optional[float] = None):
+        ts = time.time() if ts is None else ts
+        self._put(PROFILES, symbol, expiration, ts, spot,
+                  {"strike": strikes, "gex_raw": gex_raw, "gex": gex})
+
+    def _put(self, kind, symbol, expiration, ts, spot, columns):
+        try:
+            self._queue.put_nowait((kind, symbol, expiration, ts, spot, columns))
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    # --- writer thread ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Flush everything queued so far and stop the writer."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        pending: Dict[Tuple[str, str, str, str], List] = {}
+        pending_rows = 0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                item = False
+
+            if item:
+                kind, symbol, expiration, ts, spot, columns = item
+                key = (kind, symbol, trade_date(ts), expiration)
+                pending.setdefault(key, []).append((ts, spot, columns))
+                pending_rows += len(columns["strike"])
+
+            if item is None or pending_rows >= self.batch_rows or time.monotonic() >= deadline:
+                self._flush(pending)
+                pending, pending_rows = {}, 0
+                deadline = time.monotonic() + self.flush_interval
+            if item is None:
+                return
+
+    def _flush(self, pending):
+        for (kind, symbol, date, expiration), snapshots in pending.items():
+            try:
+                self._write(kind, symbol, date, expiration, snapshots)
+            except Exception as e:
+                self.write_errors += 1
+                print(f"GammaMaps Error [Archive/{kind}/{symbol}/{expiration}]: {str(e)}")
+
+    def _write(self, kind, symbol, date, expiration, snapshots):
+        schema = SCHEMAS[kind]
+        lengths = [len(cols["strike"]) for _, _, cols in snapshots]
+        arrays = {
+            "ts": np.repeat([ts for ts, _, _ in snapshots], lengths),
+            "spot": np.repeat([spot for _, spot, _ in snapshots], lengths),
+        }
+        for name in schema.names[2:]:
+            arrays[name] = np.concatenate([cols[name] for _, _, cols in snapshots])
+        table = pa.Table.from_arrays(
+            [pa.array(arrays[f.name], type=f.type) for f in schema], schema=schema
+        )
+
+        directory = os.path.join(self.root, kind, f"symbol={symbol}", f"date={date}",
+                                 f"expiration={expiration}")
+        os.makedirs(directory, exist_ok=True)
+        self._seq += 1
+        path = os.path.join(directory, f"part-{time.time_ns()}-{self._seq}.parquet")
+        pq.write_table(table, path, row_group_size=65_536)
+        self.rows_written += table.num_rows
+        self.files_written += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "rows_written": self.rows_written,
+            "files_written": self.files_written,
+            "write_errors": self.write_errors,
+        }
+
+
+def read_snapshots(root: str, kind: str, symbol: str, start: Optional[float] = None,
+                   end: Optional[float] = None, strike_min: Optional[float] = None,
+                   strike_max: Optional[float] = None, expiration: Optional[str] = None,
+                   columns: Optional[Sequence[str]] = None) -> pa.Table:
+    """
+    Read archived snapshots for one symbol, filtered by unix-time range,
+    strike band and optionally expiration.
+
+    Files are memory-mapped; partitions outside the symbol/date range are
+    never opened, and row groups are skipped using Parquet statistics.
+    """
+    path = os.path.join(root, kind)
+    if not os.path.isdir(path):
+        return SCHEMAS[kind].empty_table()
+
+    dataset = ds.dataset(path, format="parquet", partitioning=PARTITIONING,
+                         filesystem=fs.LocalFileSystem(use_mmap=True))
+
+    expr = ds.field("symbol") == symbol
+    if expiration is not None:
+        expr &= ds.field("expiration") == expiration
+    if start is not None:
+        expr &= (ds.field("date") >= trade_date(start)) & (ds.field("ts") >= start)
+    if end is not None:
+        expr &= (ds.field("date") <= trade_date(end)) & (ds.field("ts") <= end)
+    if strike_min is not None:
+        expr &= ds.field("strike") >= strike_min
+    if strike_max is not None:
+        expr &= ds.field("strike") <= strike_max
+
+    return dataset.to_table(columns=list(columns) if columns else None, filter=expr)
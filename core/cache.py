@@ -0,0 +1,225 @@
+# core/cache.py
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Per-key in-flight deduplication.
+
+    The first caller for a key runs the build; callers that arrive while it
+    is running wait for the same result (or the same exception) instead of
+    starting their own. Nothing is remembered once the build finishes, so
+    errors are never cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn() once per key across concurrent threads."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: str, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await coro_fn() once per key across concurrent tasks.
+        The build runs as its own task, so a cancelled waiter does not
+        cancel it for the others.
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(coro_fn())
+                self._tasks[key] = task
+                task.add_done_callback(lambda _t: self._forget(key, _t))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception retrieved when nobody is left awaiting it
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+
+def _json_size(value: Any) -> int:
+    # Approximate footprint as the encoded JSON length
+    return len(json.dumps(value, default=str))
+
+
+class _Entry:
+    __slots__ = ("value", "size", "stored_at", "ttl")
+
+    def __init__(self, value, size, stored_at, ttl):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+        self.ttl = ttl
+
+
+class TTLCache:
+    """
+    Bounded LRU cache with per-entry TTL and a stale-while-revalidate window.
+
+    An entry is fresh for `ttl` seconds, then stale for a further
+    `stale_ttl` seconds (callers may serve it while refreshing), after which
+    it is dropped. Least recently used entries are evicted once either
+    `max_entries` or `max_bytes` is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 30, stale_ttl: float = 60,
+                 sizeof: Callable[[Any], int] = _json_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, key: str, record: bool = True) -> Tuple[Any, Optional[str]]:
+        """
+        Returns (value, FRESH), (value, STALE) or (None, None) on a miss.
+        `record=False` skips the hit/miss counters (for double-checks).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            state = None
+            if entry is not None:
+                age = now - entry.stored_at
+                if age < entry.ttl:
+                    state = FRESH
+                elif age < entry.ttl + self.stale_ttl:
+                    state = STALE
+                else:
+                    self._remove(key)
+                    self.expirations += 1
+                    entry = None
+
+            if record:
+                if state == FRESH:
+                    self.hits += 1
+                elif state == STALE:
+                    self.stale_hits += 1
+                else:
+                    self.misses += 1
+
+            if entry is None:
+                return None, None
+            self._entries.move_to_end(key)
+            return entry.value, state
+
+    def get(self, key: str) -> Any:
+        """Fresh value or None."""
+        value, state = self.lookup(key)
+        return value if state == FRESH else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        size = self.sizeof(value)
+        entry = _Entry(value, size, time.time(), self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            }
@@ -1,41 +1,168 @@
 # core/calc.py
+import numpy as np
+
+from core.chain import OptionChain
+
+
+def exposure_by_strike(strikes, is_put, oi, gamma, spot):
+    """
+    Vectorized GEX per contract, summed per strike.
+    Returns (unique_strikes ascending, gex_per_strike) arrays.
+    """
+    keep = (oi > 0) & (gamma != 0.0)
+    strikes = strikes[keep]
+
+    # GEX Formula: Gamma * OI * 100 * Spot^2 * 0.01
+    # Scaling by Spot^2 makes it dollar-gamma-exposure which is standard for dealers.
+    gex = gamma[keep] * oi[keep] * 100.0 * (spot ** 2) * 0.01
+    gex[is_put[keep]] *= -1.0
+
+    # Grouped reduction: bincount sums contracts in chain order per strike
+    unique_strikes, inverse = np.unique(strikes, return_inverse=True)
+    totals = np.bincount(inverse, weights=gex, minlength=len(unique_strikes))
+    return unique_strikes, totals
+
+
+def exposure_arrays(options, spot):
+    """
+    Array form of compute_exposure: (strikes ascending, net GEX per strike).
+    `options` is an OptionChain or a list of vendor option dicts.
+    """
+    if not isinstance(options, OptionChain):
+        options = OptionChain.from_options(options)
+    return exposure_by_strike(options.strike, options.is_put, options.open_interest, options.gamma, spot)
+
 
 def compute_exposure(options, spot):
-    by_strike = {}
-    for opt in options:
-        try:
-            strike = float(opt["strike"])
-            opt_type = opt["option_type"]
-            oi = float(opt.get("open_interest") or 0.0)
-            gamma = float(opt.get("greeks", {}).get("gamma") or 0.0)
-        except Exception:
-            continue
-            
-        if oi <= 0 or gamma == 0.0:
-            continue
-
-        # GEX Formula: Gamma * OI * 100 * Spot^2 * 0.01
-        # Note: Some simplified versions just use Gamma * OI * 100. 
-        # Scaling by Spot^2 makes it dollar-gamma-exposure which is standard for dealers.
-        gex_line = gamma * oi * 100.0 * (spot ** 2) * 0.01
-        
-        if opt_type == "put":
-            gex_line *= -1.0
-            
-        by_strike[strike] = by_strike.get(strike, 0.0) + gex_line
-
-    return by_strike
-
-def smooth_profile(by_strike, window=1):
-    # Simple moving average smoothing to reduce noise
+    """
+    Net GEX per strike as {strike: gex}.
+    `options` is an OptionChain or a list of vendor option dicts.
+    """
+    unique_strikes, totals = exposure_arrays(options, spot)
+    return dict(zip(unique_strikes.tolist(), totals.tolist()))
+
+
+# --- Smoothing ---
+# `window` is the kernel half-width: a count of neighbouring strikes when
+# by="index", or a strike distance (e.g. 10.0 points) when by="price".
+# Edges are renormalised over the neighbours that exist, as the original
+# moving average did.
+KERNELS = ("box", "triangular", "gaussian")
+# Index-mode box windows up to this size are summed slice by slice, which
+# reproduces the left-to-right sums of the original loop bit for bit.
+_DIRECT_BOX_MAX = 16
+
+
+def _bounds(x, window, by):
+    n = len(x)
+    if by == "price":
+        lo = np.searchsorted(x, x - window, side="left")
+        hi = np.searchsorted(x, x + window, side="right")
+    else:
+        idx = np.arange(n)
+        lo = np.maximum(idx - int(window), 0)
+        hi = np.minimum(idx + int(window) + 1, n)
+    return lo, hi
+
+
+def _prefix(values):
+    out = np.empty(len(values) + 1, dtype=np.float64)
+    out[0] = 0.0
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def _box(values, lo, hi):
+    csum = _prefix(values)
+    return (csum[hi] - csum[lo]) / (hi - lo)
+
+
+def _box_direct(values, window):
+    n = len(values)
+    total = np.zeros(n)
+    count = np.zeros(n)
+    # Offsets past either end overlap nothing
+    window = min(window, n - 1)
+    for offset in range(-window, window + 1):
+        dst = slice(max(0, -offset), min(n, n - offset))
+        src = slice(max(0, offset), min(n, n + offset))
+        total[dst] += values[src]
+        count[dst] += 1.0
+    return total / count
+
+
+def _triangular(x, values, lo, hi, half_width):
+    # Weights 1 - |x_i - x_j| / h, evaluated with prefix sums of v and x*v:
+    # sum_j w_j v_j = V - (x_i * (VL - VR) - (XL - XR)) / h over the window.
+    x = x - x.mean()  # centre to keep x*v prefix sums well conditioned
+    i = np.arange(len(x))
+
+    def weighted(v):
+        pv = _prefix(v)
+        pxv = _prefix(x * v)
+        left = x * (pv[i] - pv[lo]) - (pxv[i] - pxv[lo])
+        right = (pxv[hi] - pxv[i]) - x * (pv[hi] - pv[i])
+        return (pv[hi] - pv[lo]) - (left + right) / half_width
+
+    return weighted(values) / weighted(np.ones_like(values))
+
+
+def smooth_array(strikes, values, window=1, kernel="box", by="index"):
+    """
+    Smooth a GEX profile given as ascending strikes and aligned values.
+
+    Every kernel runs at constant cost per strike regardless of window:
+    - box: moving average via prefix sums
+    - triangular: linearly decaying weights via prefix sums of v and x*v
+    - gaussian: three box passes (window / 3 half-width each), which
+      approximates a Gaussian with sigma ~= window / 3
+    """
+    if kernel not in KERNELS:
+        raise ValueError(f"Unknown smoothing kernel: {kernel}")
+    if by not in ("index", "price"):
+        raise ValueError(f"Unknown smoothing mode: {by}")
+
+    strikes = np.asarray(strikes, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0 or window <= 0:
+        return values.copy()
+
+    if kernel == "box":
+        if by == "index" and window <= _DIRECT_BOX_MAX:
+            return _box_direct(values, int(window))
+        return _box(values, *_bounds(strikes, window, by))
+
+    if kernel == "triangular":
+        x = strikes if by == "price" else np.arange(len(values), dtype=np.float64)
+        # In index mode the outermost neighbour keeps a non-zero weight
+        half_width = window if by == "price" else int(window) + 1
+        return _triangular(x, values, *_bounds(strikes, window, by), half_width)
+
+    step = window / 3.0
+    if by == "index":
+        step = max(1, int(round(step)))
+    lo, hi = _bounds(strikes, step, by)
+    for _ in range(3):
+        values = _box(values, lo, hi)
+    return values
+
+
+def smooth_profile(by_strike, window=1, kernel="box", by="index"):
+    """
+    Dict wrapper around smooth_array: {strike: gex} -> {strike: smoothed},
+    keys in ascending strike order.
+    """
     strikes = sorted(by_strike.keys())
-    smoothed = {}
-    for i, k in enumerate(strikes):
-        total = 0.0
-        count = 0
-        # look back/forward 'window' steps
-        for j in range(max(0, i - window), min(len(strikes), i + window + 1)):
-            total += by_strike[strikes[j]]
-            count += 1
-        smoothed[k] = total / count if count > 0 else by_strike[k]
-    return smoothed
+    values = np.fromiter((by_strike[k] for k in strikes), dtype=np.float64, count=len(strikes))
+    smoothed = smooth_array(strikes, values, window=window, kernel=kernel, by=by)
+    return dict(zip(strikes, smoothed.tolist()))
+
+
+def profile_arrays(strikes, is_put, oi, gamma, spot, window=1, kernel="box", by="index"):
+    """
+    exposure_by_strike followed by smooth_array: the CPU-bound part of a
+    node build as a pure function of contract arrays, so it can be sent to
+    a worker process. Returns (strikes, raw_gex, smoothed_gex).
+    """
+    k, raw = exposure_by_strike(strikes, is_put, oi, gamma, spot)
+    return k, raw, smooth_array(k, raw, window=window, kernel=kernel, by=by)
@@ -0,0 +1,119 @@
+# core/chain.py
+import hashlib
+import math
+
+import numpy as np
+
+from core.codec import loads
+
+_NAN = math.nan
+
+
+def _num(value, default=_NAN):
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+class OptionChain:
+    """
+    Columnar (struct-of-arrays) option chain for one expiration.
+
+    Holds only the fields the pipeline uses, one NumPy array per field:
+    strike, is_put (option_type == "put"), open_interest, gamma, iv, bid and
+    ask. Missing greeks / quotes are stored as 0.0 gamma and NaN iv/bid/ask.
+    """
+
+    __slots__ = ("expiration", "strike", "is_put", "open_interest", "gamma", "iv", "bid", "ask")
+
+    def __init__(self, strike, is_put, open_interest, gamma, iv, bid, ask, expiration=None):
+        self.expiration = expiration
+        self.strike = strike
+        self.is_put = is_put
+        self.open_interest = open_interest
+        self.gamma = gamma
+        self.iv = iv
+        self.bid = bid
+        self.ask = ask
+
+    def __len__(self):
+        return len(self.strike)
+
+    @property
+    def option_type(self):
+        return np.where(self.is_put, "put", "call")
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, f).nbytes for f in self.__slots__[1:])
+
+    def fingerprint(self) -> str:
+        """
+        Content hash of the columns the pipeline reads (strike, type, OI,
+        gamma, IV) and the expiration. Quote-only changes (bid/ask) keep
+        the same fingerprint.
+        """
+        h = hashlib.blake2b(f"{self.expiration}|{len(self)}".encode(), digest_size=16)
+        for column in (self.strike, self.is_put, self.open_interest, self.gamma, self.iv):
+            h.update(np.ascontiguousarray(column).data)
+        return h.hexdigest()
+
+    def with_gamma(self, gamma) -> "OptionChain":
+        """A copy sharing every column except gamma (e.g. locally repriced)."""
+        return OptionChain(self.strike, self.is_put, self.open_interest, gamma, self.iv,
+                           self.bid, self.ask, expiration=self.expiration)
+
+    @classmethod
+    def from_options(cls, options, expiration=None) -> "OptionChain":
+        """
+        Build from a list of vendor option dicts in a single pass.
+        Rows without a parseable strike, option_type or open interest are
+        dropped (the same rows compute_exposure has always skipped).
+        """
+        n = len(options)
+        cols = np.empty((6, n), dtype=np.float64)
+        is_put = np.empty(n, dtype=bool)
+
+        m = 0
+        for opt in options:
+            try:
+                strike = float(opt["strike"])
+                put = opt["option_type"] == "put"
+                oi = float(opt.get("open_interest") or 0.0)
+                greeks = opt.get("greeks", {})
+                gamma = float(greeks.get("gamma") or 0.0) if greeks is not None else 0.0
+            except Exception:
+                continue
+            iv = _NAN
+            if greeks:
+                iv = _num(greeks.get("mid_iv") or greeks.get("smv_vol"))
+            cols[0, m] = strike
+            cols[1, m] = oi
+            cols[2, m] = gamma
+            cols[3, m] = iv
+            cols[4, m] = _num(opt.get("bid"))
+            cols[5, m] = _num(opt.get("ask"))
+            is_put[m] = put
+            m += 1
+
+        # Copy each row out so the chain does not pin the (n,) scratch block
+        return cls(
+            strike=cols[0, :m].copy(),
+            is_put=is_put[:m].copy(),
+            open_interest=cols[1, :m].copy(),
+            gamma=cols[2, :m].copy(),
+            iv=cols[3, :m].copy(),
+            bid=cols[4, :m].copy(),
+            ask=cols[5, :m].copy(),
+            expiration=expiration,
+        )
+
+    @classmethod
+    def from_json(cls, payload, expiration=None) -> "OptionChain":
+        """Parse a raw Tradier /markets/options/chains response body."""
+        data = loads(payload)
+        options = (data.get("options") or {}).get("option") or []
+        if not isinstance(options, list):
+            options = [options]
+        return cls.from_options(options, expiration=expiration)
@@ -0,0 +1,165 @@
+# core/client.py
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Pool / retry defaults, overridable from the environment
+POOL_SIZE = int(os.environ.get("GAMMAMAPS_HTTP_POOL_SIZE", "16"))
+MAX_RETRIES = int(os.environ.get("GAMMAMAPS_HTTP_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.environ.get("GAMMAMAPS_HTTP_BACKOFF", "0.3"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class _HostStats:
+    """Request / connection counters for one host."""
+
+    __slots__ = ("requests", "connections")
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+
+    def as_dict(self) -> Dict:
+        reused = max(self.requests - self.connections, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+def _counting_pool(base, client):
+    # urllib3 pool subclass that reports every new socket and every request
+    # sent on a socket back to the owning client.
+    class CountingPool(base):
+        def _new_conn(self):
+            client._record(self.host, self.port, new_connection=True)
+            return super()._new_conn()
+
+        def _make_request(self, conn, method, url, *args, **kwargs):
+            client._record(self.host, self.port, new_connection=False)
+            return super()._make_request(conn, method, url, *args, **kwargs)
+
+    return CountingPool
+
+
+def _hooked_retry(client):
+    # Retry subclass that runs the calling thread's before_retry hook (see
+    # VendorClient.get) ahead of every re-send, after the backoff sleep.
+    class HookedRetry(Retry):
+        def sleep(self, response=None):
+            super().sleep(response)
+            hook = getattr(client._local, "before_retry", None)
+            if hook is not None:
+                hook()
+
+    return HookedRetry
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, client, **kwargs):
+        self._client = client
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self._client),
+            "https": _counting_pool(HTTPSConnectionPool, self._client),
+        }
+
+
+class VendorClient:
+    """
+    Shared keep-alive HTTP client for vendor calls.
+
+    Wraps a requests.Session whose connection pool keeps sockets open between
+    calls, retries 429 / 5xx responses with exponential backoff (honouring
+    Retry-After), and tracks per-host connection reuse. A per-call
+    `before_retry` hook runs before each retry is sent, so retries can be
+    charged to a rate limit like first attempts.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, max_retries: int = MAX_RETRIES,
+                 backoff_factor: float = BACKOFF_FACTOR):
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _HostStats] = {}
+        self._local = threading.local()
+
+        retry = _hooked_retry(self)(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = _CountingAdapter(
+            self,
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _record(self, host: str, port: Optional[int], new_connection: bool):
+        key = f"{host}:{port}" if port else host
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _HostStats()
+            if new_connection:
+                stats.connections += 1
+            else:
+                stats.requests += 1
+
+    def get(self, url: str, headers: Dict = None, params: Dict = None, timeout: float = 10,
+            before_retry: Optional[Callable[[], None]] = None) -> requests.Response:
+        self._local.before_retry = before_retry
+        try:
+            return self.session.get(url, headers=headers, params=params, timeout=timeout)
+        finally:
+            self._local.before_retry = None
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-host request, connection and reuse counts."""
+        with self._lock:
+            return {host: s.as_dict() for host, s in self._stats.items()}
+
+    def close(self):
+        self.session.close()
+
+
+_CLIENT: Optional[VendorClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> VendorClient:
+    """Return the process-wide VendorClient, creating it on first use."""
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = VendorClient()
+    return _CLIENT
+
+
+def set_client(client: Optional[VendorClient]) -> None:
+    """Replace the process-wide client (e.g. with a differently sized pool)."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is not None and _CLIENT is not client:
+            _CLIENT.close()
+        _CLIENT = client
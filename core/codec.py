@@ -0,0 +1,22 @@
+# core/codec.py
+import json
+from typing import Any, Union
+
+# orjson is optional; stdlib json is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    """Compact JSON bytes; NumPy arrays are serialized when orjson is present."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def loads(payload: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
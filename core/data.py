@@ -1,10 +1,41 @@
 # core/data.py
+import asyncio
+import contextvars
+import hashlib
 import os
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
-TRADIER_BASE = "https://api.tradier.com/v1"
+from core.chain import OptionChain
+from core.memo import MEMO
+from core.client import POOL_SIZE, get_client
+from core.metrics import STAGE_SECONDS, VENDOR_BYTES, VENDOR_RESPONSES
+from core.ratelimit import SPOT, RateLimiter, current_priority, priority
+from core.trace import add_span, stage
+
+# Point at a stand-in (e.g. benchmarks/fake_tradier.py) for load tests
+TRADIER_BASE = os.environ.get("TRADIER_BASE", "https://api.tradier.com/v1").rstrip("/")
 TRADIER_TOKEN = os.environ.get("TRADIER_TOKEN")
 
+# Async fan-out limits: max in-flight vendor calls per batch and the
+# per-call deadline (seconds) enforced on top of the HTTP timeout.
+ASYNC_CONCURRENCY = int(os.environ.get("GAMMAMAPS_ASYNC_CONCURRENCY", "8"))
+ASYNC_TIMEOUT = float(os.environ.get("GAMMAMAPS_ASYNC_TIMEOUT", "20"))
+
+# Vendor quota: every call takes a token first (Tradier market data allows
+# 120 requests/minute per token). A rate of 0 turns limiting off.
+VENDOR_RATE = float(os.environ.get("GAMMAMAPS_VENDOR_RATE", "2"))
+VENDOR_BURST = float(os.environ.get("GAMMAMAPS_VENDOR_BURST", "10"))
+LIMITER = RateLimiter(
+    rate=VENDOR_RATE,
+    burst=VENDOR_BURST,
+    max_queue=int(os.environ.get("GAMMAMAPS_VENDOR_MAX_QUEUE", "64")),
+    max_wait=float(os.environ.get("GAMMAMAPS_VENDOR_MAX_WAIT", "10")),
+)
+# Set when the async path already took this call's token (see _call)
+_PREPAID: contextvars.ContextVar[bool] = contextvars.ContextVar("gammamaps_vendor_prepaid", default=False)
+
 def tradier_headers():
     if not TRADIER_TOKEN:
         raise RuntimeError("TRADIER_TOKEN environment variable is not set.")
@@ -13,10 +44,47 @@ def tradier_headers():
         "Accept": "application/json",
     }
 
+def _get(endpoint: str, symbol: str, params: Dict, timeout: float, level: int = None):
+    """
+    GET {TRADIER_BASE}/markets/<endpoint> once LIMITER grants a token,
+    recording latency, status and size. Retries take a token each too.
+    `level` pins the priority; by default it is the caller's (see
+    core.ratelimit.priority), else FRONT.
+    """
+    url = f"{TRADIER_BASE}/markets/{endpoint}"
+    name = endpoint.rpartition("/")[2]
+    headers = tradier_headers()
+    level = current_priority() if level is None else level
+    before_retry = None
+    if LIMITER.enabled:
+        if _PREPAID.get():
+            _PREPAID.set(False)
+        else:
+            _wait_for_token(symbol, name, level)
+        before_retry = lambda: _wait_for_token(symbol, name, level)
+    start = time.perf_counter()
+    status = "error"
+    try:
+        resp = get_client().get(url, headers=headers, params=params, timeout=timeout,
+                                before_retry=before_retry)
+        status = str(resp.status_code)
+    finally:
+        end = time.perf_counter()
+        STAGE_SECONDS.observe(end - start, symbol, name)
+        VENDOR_RESPONSES.inc(name, status)
+        add_span(name, start, end, symbol=symbol, status=status)
+    VENDOR_BYTES.observe(len(resp.content), name)
+    return resp
+
+def _wait_for_token(symbol: str, endpoint: str, level: int):
+    queued = time.perf_counter()
+    LIMITER.acquire(level)
+    add_span("vendor_wait", queued, time.perf_counter(), symbol=symbol, endpoint=endpoint)
+
 def get_spot(symbol: str):
-    url = f"{TRADIER_BASE}/markets/quotes"
     params = {"symbols": symbol}
-    resp = requests.get(url, headers=tradier_headers(), params=params, timeout=10)
+    # Spot always goes first: every build needs it and it is one small call
+    resp = _get("quotes", symbol, params, timeout=10, level=SPOT)
     if resp.status_code != 200:
         raise RuntimeError(f"Tradier API Error: {resp.text}")
     data = resp.json()
@@ -26,16 +94,92 @@ def get_spot(symbol: str):
     return float(quote.get("last") or quote.get("close"))
 
 def get_expirations(symbol: str):
-    url = f"{TRADIER_BASE}/markets/options/expirations"
     params = {"symbol": symbol, "includeAllRoots": "true", "strikes": "false"}
-    resp = requests.get(url, headers=tradier_headers(), params=params, timeout=10)
+    resp = _get("options/expirations", symbol, params, timeout=10)
+    if resp.status_code != 200:
+        raise RuntimeError(f"Tradier API Error: {resp.text}")
     data = resp.json()
     return data.get("expirations", {}).get("date", [])
 
-def get_options_chain(symbol: str, expiration: str):
-    url = f"{TRADIER_BASE}/markets/options/chains"
+def get_options_chain(symbol: str, expiration: str) -> OptionChain:
     params = {"symbol": symbol, "expiration": expiration, "greeks": "true"}
-    resp = requests.get(url, headers=tradier_headers(), params=params, timeout=15)
-    data = resp.json()
-    options = data.get("options", {}).get("option", [])
-    return options if isinstance(options, list) else [options]
+    resp = _get("options/chains", symbol, params, timeout=15)
+    if resp.status_code != 200:
+        raise RuntimeError(f"Tradier API Error: {resp.text}")
+    return parse_chain(symbol, resp.content, expiration)
+
+def parse_chain(symbol: str, content: bytes, expiration: str) -> OptionChain:
+    """Parse a chains response; a byte-identical body reuses the chain parsed from it before."""
+    with stage(symbol, "parse"):
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        return MEMO.get_or_compute("parse", (digest, expiration),
+                                   lambda: OptionChain.from_json(content, expiration=expiration))
+
+
+# --- Async variants ---
+# The blocking fetchers above run on a dedicated executor sized to the HTTP
+# pool, so every in-flight call owns a keep-alive connection. Rate-limit
+# waits happen before that, on their own threads, so calls queued behind
+# the limiter never hold a vendor thread that a more urgent call needs.
+# Cancelling or timing out an awaiting task releases the caller
+# immediately; the worker thread finishes (or hits its HTTP timeout) in the
+# background and its result is discarded.
+_EXECUTOR = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="vendor")
+_WAITERS = ThreadPoolExecutor(max_workers=LIMITER.max_queue + POOL_SIZE,
+                              thread_name_prefix="vendor-wait")
+
+
+async def _call(fn, symbol: str, *args, endpoint: str, level: Optional[int] = None,
+                timeout: Optional[float] = None):
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context (its request trace) into the worker thread
+    ctx = contextvars.copy_context()
+
+    async def run():
+        if LIMITER.enabled:
+            await loop.run_in_executor(_WAITERS, ctx.run, _wait_for_token, symbol, endpoint,
+                                       current_priority() if level is None else level)
+            ctx.run(_PREPAID.set, True)
+        return await loop.run_in_executor(_EXECUTOR, ctx.run, fn, symbol, *args)
+
+    return await asyncio.wait_for(run(), timeout or ASYNC_TIMEOUT)
+
+
+async def get_spot_async(symbol: str, timeout: Optional[float] = None) -> float:
+    return await _call(get_spot, symbol, endpoint="quotes", level=SPOT, timeout=timeout)
+
+
+async def get_expirations_async(symbol: str, timeout: Optional[float] = None) -> List[str]:
+    return await _call(get_expirations, symbol, endpoint="expirations", timeout=timeout)
+
+
+async def get_options_chain_async(symbol: str, expiration: str,
+                                  timeout: Optional[float] = None):
+    return await _call(get_options_chain, symbol, expiration, endpoint="chains", timeout=timeout)
+
+
+async def get_options_chains_async(symbol: str, expirations: List[str],
+                                   concurrency: Optional[int] = None,
+                                   timeout: Optional[float] = None,
+                                   priorities: Optional[Dict[str, int]] = None) -> Dict:
+    """
+    Fetch many chains concurrently, at most `concurrency` at a time.
+    Returns {expiration: chain or Exception}; one failed chain does not
+    cancel the others. `priorities` maps expirations to rate-limit
+    priority classes; unlisted ones use the caller's.
+    """
+    sem = asyncio.Semaphore(concurrency or ASYNC_CONCURRENCY)
+    priorities = priorities or {}
+
+    async def fetch(exp):
+        # Each fetch runs in its own task, so the priority stays local to it
+        with priority(priorities.get(exp, current_priority())):
+            async with sem:
+                return await get_options_chain_async(symbol, exp, timeout=timeout)
+
+    results = await asyncio.gather(*(fetch(e) for e in expirations), return_exceptions=True)
+    for r in results:
+        # Cancellation must still propagate to the caller
+        if isinstance(r, asyncio.CancelledError):
+            raise r
+    return dict(zip(expirations, results))
@@ -0,0 +1,63 @@
+# core/greeks.py
+import math
+import os
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from core.chain import OptionChain
+
+MARKET_TZ = ZoneInfo("America/New_York")
+SECONDS_PER_YEAR = 365.0 * 86400.0
+# Floor on time to expiry (one minute) so expiring-day gamma stays finite
+MIN_YEARS = 60.0 / SECONDS_PER_YEAR
+
+RISK_FREE_RATE = float(os.environ.get("GAMMAMAPS_RISK_FREE_RATE", "0.0"))
+
+_SQRT_2PI = math.sqrt(2.0 * math.pi)
+
+
+@lru_cache(maxsize=1024)
+def expiry_timestamp(expiration: str) -> float:
+    """Unix time of the 16:00 New York close on an expiration date (YYYY-MM-DD)."""
+    day = datetime.strptime(expiration, "%Y-%m-%d")
+    return day.replace(hour=16, tzinfo=MARKET_TZ).timestamp()
+
+
+def years_to_expiry(expiration: str, now: Optional[float] = None) -> float:
+    now = time.time() if now is None else now
+    return max((expiry_timestamp(expiration) - now) / SECONDS_PER_YEAR, MIN_YEARS)
+
+
+def bs_gamma(spot: float, strikes: np.ndarray, iv: np.ndarray, t: float,
+             rate: float = RISK_FREE_RATE, dividend: float = 0.0) -> np.ndarray:
+    """
+    Black-Scholes gamma per contract (identical for calls and puts),
+    evaluated over whole arrays. NaN where IV or strike is not positive.
+    """
+    strikes = np.asarray(strikes, dtype=np.float64)
+    iv = np.asarray(iv, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol_t = iv * math.sqrt(t)
+        d1 = (np.log(spot / strikes) + (rate - dividend + 0.5 * iv * iv) * t) / vol_t
+        gamma = math.exp(-dividend * t) * np.exp(-0.5 * d1 * d1) / (spot * vol_t * _SQRT_2PI)
+    gamma[~((iv > 0) & (strikes > 0))] = np.nan
+    return gamma
+
+
+def local_gamma(chain: OptionChain, spot: float, now: Optional[float] = None) -> np.ndarray:
+    """
+    Gamma for every contract at the current spot and time, from the
+    chain's cached IV, strike and expiration. Contracts without a usable
+    IV (or a chain without an expiration) keep the vendor's gamma; an
+    expiration that is not a YYYY-MM-DD date raises ValueError, as it does
+    in the scenario grid.
+    """
+    if not chain.expiration or len(chain) == 0:
+        return chain.gamma
+    gamma = bs_gamma(spot, chain.strike, chain.iv, years_to_expiry(chain.expiration, now))
+    return np.where(np.isfinite(gamma), gamma, chain.gamma)
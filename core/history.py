@@ -0,0 +1,217 @@
+# core/history.py
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Snapshots kept per (symbol, expiration). A RoC lookback only reaches back
+# capacity x build cadence seconds (512 s at a 1 s cadence); older lookbacks
+# fall back to the oldest snapshot held. See capacity_for().
+HISTORY_CAPACITY = int(os.environ.get("GAMMAMAPS_HISTORY_CAPACITY", "512"))
+HISTORY_MAX_KEYS = 256   # least recently updated keys are dropped beyond this
+
+
+def capacity_for(lookback: float, cadence: float, minimum: int = HISTORY_CAPACITY) -> int:
+    """Ring size that holds `lookback` seconds of snapshots taken every `cadence` seconds."""
+    if lookback <= 0 or cadence <= 0:
+        return minimum
+    return max(minimum, math.ceil(lookback / cadence) + 2)
+
+
+class ProfileRing:
+    """
+    Fixed-size ring buffer of GEX profile snapshots for one key.
+
+    Snapshots are stored as rows of a (capacity x strikes) float array over
+    a shared ascending strike grid; the grid grows when a snapshot brings new
+    strikes, and strikes missing from a snapshot are NaN.
+    """
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.strikes = np.empty(0, dtype=np.float64)
+        self.values = np.empty((capacity, 0), dtype=np.float64)
+        self.times = np.full(capacity, np.nan)
+        self.head = 0    # next slot to write
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _extend_grid(self, strikes: np.ndarray):
+        new = np.setdiff1d(strikes, self.strikes, assume_unique=True)
+        if len(new) == 0:
+            return
+        grid = np.union1d(self.strikes, new)
+        values = np.full((self.capacity, len(grid)), np.nan)
+        values[:, np.searchsorted(grid, self.strikes)] = self.values
+        self.strikes, self.values = grid, values
+
+    def append(self, ts: float, strikes: np.ndarray, values: np.ndarray):
+        self._extend_grid(strikes)
+        row = self.values[self.head]
+        row.fill(np.nan)
+        row[np.searchsorted(self.strikes, strikes)] = values
+        self.times[self.head] = ts
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def slots(self) -> np.ndarray:
+        """Ring slot indices, oldest first."""
+        start = (self.head - self.count) % self.capacity
+        return (start + np.arange(self.count)) % self.capacity
+
+    def reference_slot(self, lookback: float, now: float) -> Optional[int]:
+        """
+        Slot to compare against: the latest snapshot at least `lookback`
+        seconds old (the previous snapshot when lookback is 0), else the
+        oldest one held.
+        """
+        if self.count == 0:
+            return None
+        slots = self.slots()
+        if lookback <= 0:
+            return int(slots[-1])
+        times = self.times[slots]
+        idx = np.searchsorted(times, now - lookback, side="right") - 1
+        return int(slots[max(idx, 0)])
+
+    def row_for(self, slot: int, strikes: np.ndarray) -> np.ndarray:
+        """Values of one snapshot aligned with `strikes` (NaN where absent)."""
+        out = np.full(len(strikes), np.nan)
+        if len(self.strikes) == 0:
+            return out
+        pos = np.minimum(np.searchsorted(self.strikes, strikes), len(self.strikes) - 1)
+        found = self.strikes[pos] == strikes
+        out[found] = self.values[slot, pos[found]]
+        return out
+
+
+class HistoryStore:
+    """Per-(symbol, expiration) ProfileRing buffers."""
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY, max_keys: int = HISTORY_MAX_KEYS):
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._rings: "OrderedDict[Tuple[str, str], ProfileRing]" = OrderedDict()
+
+    def reference(self, symbol: str, expiration: Optional[str], strikes: np.ndarray,
+                  lookback: float = 0.0, now: Optional[float] = None) -> np.ndarray:
+        """
+        GEX per strike from the reference snapshot for a RoC comparison,
+        NaN for strikes without history.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            ring = self._rings.get((symbol, expiration or ""))
+            if ring is None:
+                return np.full(len(strikes), np.nan)
+            slot = ring.reference_slot(lookback, now)
+            if slot is None:
+                return np.full(len(strikes), np.nan)
+            return ring.row_for(slot, strikes)
+
+    def marker(self, symbol: str, expiration: Optional[str], lookback: float = 0.0,
+               now: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        """
+        (time of the latest snapshot, time of the reference snapshot for
+        `lookback`), or None without history: changes whenever a RoC
+        comparison made now would compare against different data.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            ring = self._rings.get((symbol, expiration or ""))
+            if ring is None or ring.count == 0:
+                return None
+            latest = ring.slots()[-1]
+            return float(ring.times[latest]), float(ring.times[ring.reference_slot(lookback, now)])
+
+    def record(self, symbol: str, expiration: Optional[str], strikes: np.ndarray,
+               values: np.ndarray, now: Optional[float] = None):
+        """Append a snapshot; `strikes` must be ascending."""
+        key = (symbol, expiration or "")
+        now = time.time() if now is None else now
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                ring = self._rings[key] = ProfileRing(self.capacity)
+                while len(self._rings) > self.max_keys:
+                    self._rings.popitem(last=False)
+            self._rings.move_to_end(key)
+            ring.append(now, strikes, values)
+
+    def series(self, symbol: str, expiration: Optional[str], start: float = None,
+               end: float = None, max_points: int = 200, strike_min: float = None,
+               strike_max: float = None) -> Optional[Dict]:
+        """
+        Downsampled GEX-per-strike time series, oldest first.
+
+        Only the selected rows and the strike band are gathered from the
+        ring, never the whole buffer.
+        """
+        with self._lock:
+            ring = self._rings.get((symbol, expiration or ""))
+            if ring is None or ring.count == 0:
+                return None
+            slots = ring.slots()
+            times = ring.times[slots]
+            lo = 0 if start is None else np.searchsorted(times, start, side="left")
+            hi = len(slots) if end is None else np.searchsorted(times, end, side="right")
+            step = max(1, math.ceil((hi - lo) / max(max_points, 1)))
+            rows = slots[lo:hi][::-1][::step][::-1]  # keep the newest snapshot
+
+            k_lo = 0 if strike_min is None else np.searchsorted(ring.strikes, strike_min, side="left")
+            k_hi = len(ring.strikes) if strike_max is None else np.searchsorted(ring.strikes, strike_max, side="right")
+            strikes = ring.strikes[k_lo:k_hi].tolist()
+            block = ring.values[rows, k_lo:k_hi]
+            timestamps = ring.times[rows].tolist()
+
+        gex = [[None if v != v else v for v in row] for row in block.tolist()]
+        return {
+            "symbol": symbol,
+            "expiration": expiration,
+            "strikes": strikes,
+            "timestamps": timestamps,
+            "gex": gex,
+        }
+
+    def keys(self):
+        with self._lock:
+            return list(self._rings.keys())
+
+    def save(self, path: str):
+        """Persist every ring to a single .npz file at exactly `path`."""
+        arrays = {}
+        with self._lock:
+            keys = list(self._rings.items())
+            for i, ((symbol, exp), ring) in enumerate(keys):
+                slots = ring.slots()
+                arrays[f"k{i}_strikes"] = ring.strikes
+                arrays[f"k{i}_values"] = ring.values[slots]
+                arrays[f"k{i}_times"] = ring.times[slots]
+            arrays["keys"] = np.array([f"{s}|{e}" for (s, e), _ in keys], dtype=str)
+        # Through a file handle, since savez appends ".npz" to bare paths;
+        # replaced atomically so a crash never leaves a truncated file
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, path)
+
+    def load(self, path: str):
+        """Restore rings written by save(); snapshots beyond capacity are dropped."""
+        with np.load(path) as data:
+            with self._lock:
+                for i, key in enumerate(data["keys"].tolist()):
+                    symbol, _, exp = key.partition("|")
+                    ring = ProfileRing(self.capacity)
+                    strikes = data[f"k{i}_strikes"]
+                    for ts, row in zip(data[f"k{i}_times"][-self.capacity:],
+                                       data[f"k{i}_values"][-self.capacity:]):
+                        keep = ~np.isnan(row)
+                        ring.append(float(ts), strikes[keep], row[keep])
+                    self._rings[(symbol, exp)] = ring
@@ -0,0 +1,105 @@
+# core/memo.py
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+MEMO_MAX_ENTRIES = int(os.environ.get("GAMMAMAPS_MEMO_MAX_ENTRIES", "2048"))
+MEMO_MAX_BYTES = int(os.environ.get("GAMMAMAPS_MEMO_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def _nbytes(value: Any) -> int:
+    # Arrays / chains report their buffers; containers (node dicts) are
+    # walked, charging every object they hold
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(_nbytes(v) for v in value)
+    elif isinstance(value, dict):
+        size += sum(_nbytes(k) + _nbytes(v) for k, v in value.items())
+    return size
+
+
+class StageMemo:
+    """
+    Bounded LRU of pipeline stage outputs, keyed by (stage, fingerprint of
+    the stage's inputs), with hit / miss counts per stage. Both the entry
+    count and the (approximate) bytes held are capped.
+
+    Outputs are shared between callers and must be treated as read-only.
+    A None key bypasses the store (inputs that cannot be fingerprinted).
+    """
+
+    def __init__(self, max_entries: int = MEMO_MAX_ENTRIES, max_bytes: int = MEMO_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # (stage, key) -> (value, size)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self.evictions = 0
+
+    def lookup(self, stage: str, key: Optional[Hashable]) -> Tuple[bool, Any]:
+        """(True, output) if memoized, else (False, None)."""
+        if key is None:
+            return False, None
+        with self._lock:
+            try:
+                value, _ = self._entries[(stage, key)]
+            except KeyError:
+                self._misses[stage] = self._misses.get(stage, 0) + 1
+                return False, None
+            self._entries.move_to_end((stage, key))
+            self._hits[stage] = self._hits.get(stage, 0) + 1
+            return True, value
+
+    def store(self, stage: str, key: Optional[Hashable], value: Any):
+        if key is None or self.max_entries <= 0:
+            return
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop((stage, key), None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[(stage, key)] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def get_or_compute(self, stage: str, key: Optional[Hashable], compute: Callable[[], Any]) -> Any:
+        hit, value = self.lookup(stage, key)
+        if not hit:
+            value = compute()
+            self.store(stage, key, value)
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stages = {}
+            for stage in sorted(set(self._hits) | set(self._misses)):
+                hits, misses = self._hits.get(stage, 0), self._misses.get(stage, 0)
+                stages[stage] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                }
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "evictions": self.evictions, "stages": stages}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# Process-wide store shared by the data layer (parsed chains) and the service
+MEMO = StageMemo()
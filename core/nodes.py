@@ -1,100 +1,125 @@
 # core/nodes.py
+import time
 from typing import Dict, List, Optional
 
-# Simple in-memory cache to track previous GEX for "Rate of Change"
-# Format: { "SPX": { strike: gex_value, ... } }
-PREVIOUS_STATE = {}
+import numpy as np
 
-def extract_nodes(profile: Dict[float, float], spot: float, symbol: str = "UNKNOWN") -> Dict:
+from core.history import HistoryStore
+
+# In-band profile snapshots per (symbol, expiration) for "Rate of Change"
+HISTORY = HistoryStore()
+
+TOP_NODES = 5
+
+
+def extract_nodes(profile: Dict[float, float], spot: float, symbol: str = "UNKNOWN",
+                  expiration: str = None, lookback: float = 0.0) -> Dict:
     """
     Extracts nodes with advanced logic:
     - Gatekeeper detection (nodes blocking path to King Node)
-    - Rate of Change (RoC) vs previous fetch
+    - Rate of Change (RoC) vs the snapshot `lookback` seconds ago for the
+      same symbol and expiration (the previous fetch when lookback is 0)
     - Absolute strength normalization
     """
     if not profile:
         return None
 
+    strikes = np.fromiter(profile.keys(), dtype=np.float64, count=len(profile))
+    gex = np.fromiter(profile.values(), dtype=np.float64, count=len(profile))
+    if np.any(strikes[1:] < strikes[:-1]):
+        order = np.argsort(strikes, kind="stable")
+        strikes, gex = strikes[order], gex[order]
+    return extract_nodes_arrays(strikes, gex, spot, symbol=symbol,
+                                expiration=expiration, lookback=lookback)
+
+
+def extract_nodes_arrays(strikes: np.ndarray, gex: np.ndarray, spot: float,
+                         symbol: str = "UNKNOWN", expiration: str = None,
+                         lookback: float = 0.0, history: HistoryStore = None,
+                         now: float = None) -> Optional[Dict]:
+    """
+    Array form of extract_nodes over ascending strikes and aligned GEX.
+    All classification is done with masks; dicts are only built for output.
+
+    `history` and `now` default to the live HISTORY and wall clock; replays
+    pass their own store and the snapshot time.
+    """
+    if len(strikes) == 0:
+        return None
+
     # --- 1. Basic Calculations ---
-    net_exposure = sum(profile.values())
-    abs_values = [abs(v) for v in profile.values()]
-    max_abs = max(abs_values) if abs_values else 1.0
+    # cumsum accumulates left to right, matching sum() over the profile
+    net_exposure = float(np.cumsum(gex)[-1])
+    abs_gex = np.abs(gex)
+    max_abs = float(abs_gex.max())
 
     # --- 2. Identify King Node ---
-    # The strike with the single highest absolute GEX
-    king_strike = max(profile.items(), key=lambda kv: abs(kv[1]))[0]
+    # The strike with the single highest absolute GEX (first on ties)
+    king_strike = float(strikes[np.argmax(abs_gex)])
 
     # --- 3. Prepare "All Nodes" with Logic ---
-    relevant_strikes = [k for k in profile.keys() if 0.90 * spot < k < 1.10 * spot]
-    relevant_strikes.sort(reverse=True)
-
-    # Retrieve previous state for this symbol to calc RoC
-    prev_gex_map = PREVIOUS_STATE.get(symbol, {})
-    new_gex_map = {}
-
-    all_nodes = []
-    
-    for strike in relevant_strikes:
-        val = profile[strike]
-        new_gex_map[strike] = val
-        
-        # Absolute Strength (0.0 to 1.0)
-        strength = abs(val) / max_abs
-
-        # --- Bias / Color Logic ---
-        # Yellow (Magnet) if very strong (>65% of max)
-        if strength > 0.65:
-            bias = "magnet"
-        elif val > 0:
-            bias = "resistance"
-        else:
-            bias = "support"
-
-        # --- Rate of Change (RoC) ---
-        # Calculate change from last fetch
-        prev_val = prev_gex_map.get(strike, val) # Default to current if no history
-        gex_change = val - prev_val 
-        
-        # Determine RoC Label
-        # Threshold: e.g., change > 5% of max_abs is significant
-        roc_label = "neutral"
-        if gex_change > (0.05 * max_abs):
-            roc_label = "accumulation" # gaining positive exposure (or shrinking negative)
-        elif gex_change < -(0.05 * max_abs):
-            roc_label = "unwinding"    # losing positive exposure (or growing negative)
-
-        # --- Gatekeeper Logic ---
-        # A Gatekeeper is a strong node (e.g. >40% strength) that sits BETWEEN Spot and King
-        is_gatekeeper = False
-        if strength > 0.40 and strike != king_strike:
-            if spot < strike < king_strike:  # Price is below, King is above, node is in middle
-                is_gatekeeper = True
-            elif king_strike < strike < spot: # Price is above, King is below, node is in middle
-                is_gatekeeper = True
-
-        all_nodes.append({
-            "strike": strike,
-            "strength": round(strength, 4),
-            "gex": int(val),
-            "gex_change": int(gex_change),
-            "bias": bias,
-            "is_king": (strike == king_strike),
-            "is_gatekeeper": is_gatekeeper,
-            "roc": roc_label
-        })
-
-    # Update cache for next time
-    PREVIOUS_STATE[symbol] = new_gex_map
+    lo = np.searchsorted(strikes, 0.90 * spot, side="right")
+    hi = np.searchsorted(strikes, 1.10 * spot, side="left")
+    # Band in descending strike order (the output order)
+    band_k = strikes[lo:hi][::-1]
+    band_v = gex[lo:hi][::-1]
+
+    strength = np.abs(band_v) / max_abs
+
+    # Bias: magnet if very strong (>65% of max), else by sign
+    bias = np.where(strength > 0.65, "magnet", np.where(band_v > 0, "resistance", "support"))
+
+    # Rate of Change vs the reference snapshot (defaults to current if no history)
+    history = HISTORY if history is None else history
+    now = time.time() if now is None else now
+    asc_k, asc_v = band_k[::-1], band_v[::-1]
+    prev_v = history.reference(symbol, expiration, asc_k, lookback=lookback, now=now)[::-1]
+    prev_v = np.where(np.isnan(prev_v), band_v, prev_v)
+    gex_change = band_v - prev_v
+    threshold = 0.05 * max_abs
+    roc = np.where(gex_change > threshold, "accumulation",
+                   np.where(gex_change < -threshold, "unwinding", "neutral"))
+
+    # Gatekeeper: strong node (>40%) sitting between Spot and King
+    is_king = band_k == king_strike
+    between = ((spot < band_k) & (band_k < king_strike)) | ((king_strike < band_k) & (band_k < spot))
+    is_gatekeeper = (strength > 0.40) & ~is_king & between
+
+    # Record this snapshot for later comparisons
+    history.record(symbol, expiration, asc_k, asc_v, now=now)
+
+    # --- Output boundary ---
+    strength_r = [round(s, 4) for s in strength.tolist()]
+    all_nodes = [
+        {
+            "strike": k,
+            "strength": s,
+            "gex": int(v),
+            "gex_change": int(c),
+            "bias": b,
+            "is_king": kg,
+            "is_gatekeeper": gk,
+            "roc": r,
+        }
+        for k, s, v, c, b, kg, gk, r in zip(
+            band_k.tolist(), strength_r, band_v.tolist(), gex_change.tolist(),
+            bias.tolist(), is_king.tolist(), is_gatekeeper.tolist(), roc.tolist(),
+        )
+    ]
 
     # --- 4. Summary Stats ---
-    strong_nodes = sorted(all_nodes, key=lambda x: x['strength'], reverse=True)[:5]
-    
-    # Nearest Levels logic remains same
-    below = [n for n in all_nodes if n["strike"] <= spot and n["bias"] != "resistance" and n["strength"] > 0.15]
-    above = [n for n in all_nodes if n["strike"] >= spot and n["bias"] != "support" and n["strength"] > 0.15]
-    
-    nearest_support = max(below, key=lambda n: n["strike"])["strike"] if below else None
-    nearest_resistance = min(above, key=lambda n: n["strike"])["strike"] if above else None
+    strength_r = np.array(strength_r, dtype=np.float64)
+    strong_nodes = [all_nodes[i] for i in _top_indices(strength_r, TOP_NODES)]
+
+    # Nearest levels: qualifying nodes on each side of spot (band is descending)
+    strong_enough = strength_r > 0.15
+    split_le = len(band_k) - np.searchsorted(band_k[::-1], spot, side="right")  # first index <= spot
+    split_ge = len(band_k) - np.searchsorted(band_k[::-1], spot, side="left")   # end of >= spot
+    below = np.flatnonzero(strong_enough[split_le:] & (bias[split_le:] != "resistance"))
+    above = np.flatnonzero(strong_enough[:split_ge] & (bias[:split_ge] != "support"))
+
+    nearest_support = all_nodes[split_le + below[0]]["strike"] if len(below) else None
+    nearest_resistance = all_nodes[above[-1]]["strike"] if len(above) else None
 
     # Environment Logic
     if abs(net_exposure) < 0.2 * max_abs:
@@ -112,3 +137,17 @@ def extract_nodes(profile: Dict[float, float], spot: float, symbol: str = "UNKNO
         strong_nodes=strong_nodes,
         nearest_levels={"support": nearest_support, "resistance": nearest_resistance}
     )
+
+
+def _top_indices(values: np.ndarray, n: int) -> List[int]:
+    """
+    Indices of the n largest values, largest first, ties in index order
+    (the same result as a stable descending sort truncated to n).
+    """
+    if len(values) <= n:
+        candidates = np.arange(len(values))
+    else:
+        cutoff = values[np.argpartition(-values, n - 1)[:n]].min()
+        candidates = np.flatnonzero(values >= cutoff)
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order][:n].tolist()
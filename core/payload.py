@@ -0,0 +1,69 @@
+# core/payload.py
+import gzip
+import hashlib
+import re
+from typing import Any, Optional
+
+from core.codec import dumps
+
+
+# Build times embedded in results; left out of the ETag so a rebuild with
+# unchanged content keeps validating
+_TIMESTAMPS = re.compile(rb'"timestamp":-?[0-9.eE+-]+')
+
+
+class Payload:
+    """
+    A response body encoded once at build time.
+
+    Keeps the source data (for server-side consumers), the encoded JSON
+    bytes, an ETag derived from the bytes, and a lazily built gzip copy
+    that is reused by every request for the same entry. The gzip body has
+    its own ETag (suffixed "-gzip"). Build timestamps are left out of the
+    hash, so bodies sharing a tag may differ in bytes: the tags are weak.
+    """
+
+    __slots__ = ("data", "body", "etag", "_gzipped")
+
+    def __init__(self, data: Any):
+        self.data = data
+        self.body = dumps(data)
+        digest = hashlib.blake2b(_TIMESTAMPS.sub(b"", self.body), digest_size=16).hexdigest()
+        self.etag = f'W/"{digest}"'
+        self._gzipped: Optional[bytes] = None
+
+    @property
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=5)
+        return self._gzipped
+
+    @property
+    def gzip_etag(self) -> str:
+        return self.etag[:-1] + '-gzip"'
+
+    @staticmethod
+    def _opaque(tag: str) -> str:
+        return tag[2:] if tag.startswith("W/") else tag
+
+    def __len__(self) -> int:
+        return len(self.body)
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """
+        True if an If-None-Match header value covers this payload (either
+        encoding), by the weak comparison If-None-Match calls for.
+        """
+        if not if_none_match:
+            return False
+        ours = (self._opaque(self.etag), self._opaque(self.gzip_etag))
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or self._opaque(tag) in ours:
+                return True
+        return False
+
+
+def payload_size(value: Any) -> int:
+    """TTLCache sizeof for Payload values: the encoded body length."""
+    return len(value) if isinstance(value, Payload) else len(dumps(value))
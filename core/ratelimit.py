@@ -0,0 +1,169 @@
+# core/ratelimit.py
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional
+
+from core.metrics import REGISTRY
+
+# Priority classes, most urgent first
+SPOT = 0
+FRONT = 1          # nearest expirations
+BACK = 2           # later expirations
+BACKGROUND = 3     # pre-warming and stale revalidation
+PRIORITY_NAMES = ("spot", "front", "back", "background")
+
+# Priority of the vendor calls made by the current task / thread; unset
+# means each endpoint's default (see core.data._get)
+_PRIORITY: ContextVar[Optional[int]] = ContextVar("gammamaps_vendor_priority", default=None)
+
+VENDOR_WAIT_SECONDS = REGISTRY.histogram(
+    "gammamaps_vendor_wait_seconds", "Time vendor calls waited for a rate-limit token",
+    ("priority",))
+VENDOR_SHED = REGISTRY.counter(
+    "gammamaps_vendor_shed_total", "Vendor calls refused by the rate limiter",
+    ("priority", "reason"))
+
+
+class RateLimited(RuntimeError):
+    """A vendor call was shed by the rate limiter instead of sent."""
+
+
+def current_priority(default: int = FRONT) -> int:
+    level = _PRIORITY.get()
+    return default if level is None else level
+
+
+class priority:
+    """Context manager running vendor calls in the block at `level`."""
+
+    __slots__ = ("level", "token")
+
+    def __init__(self, level: Optional[int]):
+        self.level = level
+
+    def __enter__(self):
+        self.token = _PRIORITY.set(self.level)
+        return self
+
+    def __exit__(self, *exc):
+        _PRIORITY.reset(self.token)
+
+
+class _Waiter:
+    __slots__ = ("level", "queued", "shed")
+
+    def __init__(self, level: int):
+        self.level = level
+        self.queued = time.monotonic()
+        self.shed = False
+
+
+class RateLimiter:
+    """
+    Token bucket in front of the vendor, shared by every thread.
+
+    Tokens refill at `rate` per second up to `burst`. A call that finds no
+    token queues behind its priority class and is released strictly in
+    priority order (FIFO within a class) as tokens come in. At most
+    `max_queue` calls wait at once: a newcomer to a full queue displaces
+    the most recent waiter of a lower class, or is refused itself when
+    nothing queued is less urgent. Waiting longer than `max_wait` also
+    refuses the call. Refusals raise RateLimited. `rate` <= 0 disables
+    limiting.
+    """
+
+    def __init__(self, rate: float, burst: float, max_queue: int = 64, max_wait: float = 10.0):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._queues: List[Deque[_Waiter]] = [deque() for _ in PRIORITY_NAMES]
+        self._waiting = 0
+        self.granted = [0] * len(PRIORITY_NAMES)
+        self.shed = [0] * len(PRIORITY_NAMES)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self, now: float):
+        # Caller holds self._cond
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _head(self) -> Optional[_Waiter]:
+        for queue in self._queues:
+            if queue:
+                return queue[0]
+        return None
+
+    def _refuse(self, level: int, reason: str):
+        self.shed[level] += 1
+        VENDOR_SHED.inc(PRIORITY_NAMES[level], reason)
+        raise RateLimited(f"Vendor rate limit: {PRIORITY_NAMES[level]} call {reason}")
+
+    def acquire(self, level: int = FRONT) -> float:
+        """Block until a token is granted at `level`; returns seconds waited."""
+        if not self.enabled:
+            return 0.0
+        level = min(max(level, 0), len(PRIORITY_NAMES) - 1)
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if not self._waiting and self._tokens >= 1:
+                self._tokens -= 1
+                self.granted[level] += 1
+                VENDOR_WAIT_SECONDS.observe(0.0, PRIORITY_NAMES[level])
+                return 0.0
+
+            if self._waiting >= self.max_queue:
+                victim = next((q for q in reversed(self._queues[level + 1:]) if q), None)
+                if victim is None:
+                    self._refuse(level, "shed")
+                victim.pop().shed = True
+                self._waiting -= 1
+                self._cond.notify_all()
+
+            waiter = _Waiter(level)
+            self._queues[level].append(waiter)
+            self._waiting += 1
+            deadline = waiter.queued + self.max_wait
+            while True:
+                if waiter.shed:
+                    self._refuse(level, "shed")
+                now = time.monotonic()
+                self._refill(now)
+                if self._head() is waiter and self._tokens >= 1:
+                    self._queues[level].popleft()
+                    self._waiting -= 1
+                    self._tokens -= 1
+                    self.granted[level] += 1
+                    # The next waiter may be able to go on the remaining tokens
+                    self._cond.notify_all()
+                    waited = now - waiter.queued
+                    VENDOR_WAIT_SECONDS.observe(waited, PRIORITY_NAMES[level])
+                    return waited
+                if now >= deadline:
+                    self._queues[level].remove(waiter)
+                    self._waiting -= 1
+                    self._cond.notify_all()
+                    self._refuse(level, "timeout")
+                until_token = max((1 - self._tokens) / self.rate, 0.001)
+                self._cond.wait(min(until_token, deadline - now))
+
+    def stats(self) -> Dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 3),
+                "queued": {name: len(q) for name, q in zip(PRIORITY_NAMES, self._queues)},
+                "granted": dict(zip(PRIORITY_NAMES, self.granted)),
+                "shed": dict(zip(PRIORITY_NAMES, self.shed)),
+            }
@@ -0,0 +1,214 @@
+# core/replay.py
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from core.archive import CHAINS
+from core.calc import exposure_by_strike, smooth_array
+from core.history import HistoryStore
+from core.nodes import extract_nodes_arrays
+
+# One row per (snapshot time, expiration) replayed
+RESULT_SCHEMA = pa.schema([
+    ("ts", pa.float64()),
+    ("expiration", pa.string()),
+    ("spot", pa.float64()),
+    ("net_exposure", pa.float64()),
+    ("environment", pa.string()),
+    ("king_node", pa.float64()),
+    ("nearest_support", pa.float64()),
+    ("nearest_resistance", pa.float64()),
+    ("gatekeepers", pa.list_(pa.float64())),
+    ("accumulation", pa.int32()),
+    ("unwinding", pa.int32()),
+])
+
+_EXPIRATION_PARTITIONING = ds.partitioning(pa.schema([("expiration", pa.string())]), flavor="hive")
+
+
+def list_partitions(root: str, symbols: Optional[Iterable[str]] = None, start: Optional[str] = None,
+                    end: Optional[str] = None) -> List[Tuple[str, str, int]]:
+    """
+    (symbol, date, bytes) for every archived chain partition in range,
+    largest first so the pool never finishes on one long straggler.
+    """
+    base = os.path.join(root, CHAINS)
+    wanted = set(symbols) if symbols else None
+    out = []
+    if not os.path.isdir(base):
+        return out
+    for sym_dir in os.listdir(base):
+        symbol = sym_dir.partition("=")[2]
+        if wanted is not None and symbol not in wanted:
+            continue
+        for date_dir in os.listdir(os.path.join(base, sym_dir)):
+            date = date_dir.partition("=")[2]
+            if (start and date < start) or (end and date > end):
+                continue
+            size = 0
+            for dirpath, _, files in os.walk(os.path.join(base, sym_dir, date_dir)):
+                size += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+            out.append((symbol, date, size))
+    out.sort(key=lambda p: -p[2])
+    return out
+
+
+def replay_partition(root: str, symbol: str, date: str, out_root: str, window: float = 1,
+                     kernel: str = "box", by: str = "index", lookback: float = 0.0) -> Dict:
+    """
+    Replay one symbol/day of archived chains through the node pipeline in
+    time order and write the results to out_root/symbol=/date=/.
+
+    RoC state lives in a HistoryStore private to the partition, keyed per
+    expiration and clocked by snapshot time, so results do not depend on
+    which worker runs the partition or what it ran before.
+    """
+    started = time.perf_counter()
+    path = os.path.join(root, CHAINS, f"symbol={symbol}", f"date={date}")
+    dataset = ds.dataset(path, format="parquet", partitioning=_EXPIRATION_PARTITIONING,
+                         filesystem=fs.LocalFileSystem(use_mmap=True))
+    table = dataset.to_table(columns=["ts", "spot", "strike", "is_put", "open_interest",
+                                      "gamma", "expiration"])
+
+    encoded = pc.dictionary_encode(table.column("expiration")).combine_chunks()
+    expirations = encoded.dictionary.to_pylist()
+    exp_code = encoded.indices.to_numpy()
+    ts = table.column("ts").to_numpy()
+
+    # Time order, expirations in a fixed order within a timestamp
+    order = np.lexsort((exp_code, ts))
+    ts, exp_code = ts[order], exp_code[order]
+    spot = table.column("spot").to_numpy()[order]
+    strike = table.column("strike").to_numpy()[order]
+    is_put = table.column("is_put").to_numpy(zero_copy_only=False)[order]
+    oi = table.column("open_interest").to_numpy()[order]
+    gamma = table.column("gamma").to_numpy()[order]
+
+    n = len(ts)
+    breaks = np.flatnonzero((ts[1:] != ts[:-1]) | (exp_code[1:] != exp_code[:-1])) + 1
+    bounds = zip(np.r_[0, breaks].tolist(), np.r_[breaks, n].tolist()) if n else ()
+
+    history = HistoryStore(max_keys=max(len(expirations), 1))
+    cols = {name: [] for name in RESULT_SCHEMA.names}
+    for lo, hi in bounds:
+        snap_ts = float(ts[lo])
+        snap_spot = float(spot[lo])
+        expiration = expirations[exp_code[lo]]
+        strikes, raw_gex = exposure_by_strike(strike[lo:hi], is_put[lo:hi], oi[lo:hi],
+                                              gamma[lo:hi], snap_spot)
+        gex = smooth_array(strikes, raw_gex, window=window, kernel=kernel, by=by)
+        result = extract_nodes_arrays(strikes, gex, snap_spot, symbol=symbol, expiration=expiration,
+                                      lookback=lookback, history=history, now=snap_ts)
+        if result is None:
+            continue
+
+        nodes = result["all_nodes"]
+        cols["ts"].append(snap_ts)
+        cols["expiration"].append(expiration)
+        cols["spot"].append(snap_spot)
+        cols["net_exposure"].append(result["net_exposure"])
+        cols["environment"].append(result["environment"])
+        cols["king_node"].append(result["king_node"])
+        cols["nearest_support"].append(result["nearest_levels"]["support"])
+        cols["nearest_resistance"].append(result["nearest_levels"]["resistance"])
+        cols["gatekeepers"].append([nd["strike"] for nd in nodes if nd["is_gatekeeper"]])
+        cols["accumulation"].append(sum(nd["roc"] == "accumulation" for nd in nodes))
+        cols["unwinding"].append(sum(nd["roc"] == "unwinding" for nd in nodes))
+
+    out = pa.table(cols, schema=RESULT_SCHEMA)
+    directory = os.path.join(out_root, f"symbol={symbol}", f"date={date}")
+    os.makedirs(directory, exist_ok=True)
+    pq.write_table(out, os.path.join(directory, "replay.parquet"))
+
+    return {
+        "symbol": symbol,
+        "date": date,
+        "contracts": n,
+        "snapshots": out.num_rows,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def replay(root: str, out_root: str, symbols: Optional[Iterable[str]] = None,
+           start: Optional[str] = None, end: Optional[str] = None, workers: Optional[int] = None,
+           window: float = 1, kernel: str = "box", by: str = "index",
+           lookback: float = 0.0) -> Dict:
+    """
+    Replay every archived symbol/day in [start, end] (YYYY-MM-DD) across a
+    process pool, one partition per task. workers=0 runs inline.
+    """
+    partitions = list_partitions(root, symbols, start, end)
+    params = dict(window=window, kernel=kernel, by=by, lookback=lookback)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+
+    started = time.perf_counter()
+    done, errors = [], []
+    if workers == 0:
+        for symbol, date, _ in partitions:
+            try:
+                done.append(replay_partition(root, symbol, date, out_root, **params))
+            except Exception as e:
+                errors.append({"symbol": symbol, "date": date, "error": str(e)})
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(replay_partition, root, symbol, date, out_root, **params): (symbol, date)
+                for symbol, date, _ in partitions
+            }
+            for fut in as_completed(futures):
+                try:
+                    done.append(fut.result())
+                except Exception as e:
+                    symbol, date = futures[fut]
+                    errors.append({"symbol": symbol, "date": date, "error": str(e)})
+    elapsed = time.perf_counter() - started
+
+    contracts = sum(p["contracts"] for p in done)
+    snapshots = sum(p["snapshots"] for p in done)
+    return {
+        "partitions": len(done),
+        "workers": workers,
+        "contracts": contracts,
+        "snapshots": snapshots,
+        "seconds": elapsed,
+        "worker_seconds": sum(p["seconds"] for p in done),
+        "contracts_per_sec": contracts / elapsed if elapsed > 0 else 0.0,
+        "snapshots_per_sec": snapshots / elapsed if elapsed > 0 else 0.0,
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay archived chains through the node pipeline")
+    parser.add_argument("root", help="archive root (GAMMAMAPS_ARCHIVE_DIR)")
+    parser.add_argument("out", help="output directory for replay Parquet files")
+    parser.add_argument("--symbols", help="comma-separated symbols (default: all)")
+    parser.add_argument("--start", help="first trade date, YYYY-MM-DD")
+    parser.add_argument("--end", help="last trade date, YYYY-MM-DD")
+    parser.add_argument("--workers", type=int, default=None, help="processes (0 = inline)")
+    parser.add_argument("--window", type=float, default=float(os.environ.get("GAMMAMAPS_SMOOTH_WINDOW", "1")))
+    parser.add_argument("--kernel", default=os.environ.get("GAMMAMAPS_SMOOTH_KERNEL", "box"))
+    parser.add_argument("--by", default=os.environ.get("GAMMAMAPS_SMOOTH_BY", "index"))
+    parser.add_argument("--lookback", type=float,
+                        default=float(os.environ.get("GAMMAMAPS_ROC_LOOKBACK_SECONDS", "0")))
+    args = parser.parse_args(argv)
+
+    symbols = args.symbols.split(",") if args.symbols else None
+    stats = replay(args.root, args.out, symbols=symbols, start=args.start, end=args.end,
+                   workers=args.workers, window=args.window, kernel=args.kernel, by=args.by,
+                   lookback=args.lookback)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# core/scenario.py
+import math
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.chain import OptionChain
+from core.greeks import RISK_FREE_RATE, years_to_expiry
+
+SCENARIO_WIDTH = 0.10    # spot shocks of +/- 10%
+SCENARIO_STEP = 0.001    # in 0.1% steps
+
+# Same scaling as exposure_by_strike: gamma * OI * 100 * S^2 * 0.01
+_CONTRACT_SCALE = 100.0 * 0.01
+_INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+# Contracts are processed in blocks of at most this many (contract, spot)
+# cells, which caps the per-thread scratch buffer at 2 MB
+SCENARIO_BLOCK_ELEMENTS = 1 << 18
+
+
+@lru_cache(maxsize=32)
+def _grid(width: float, step: float):
+    """Relative spot moves and their log1p, shared by every call with this grid."""
+    k = int(round(width / step))
+    moves = np.arange(-k, k + 1, dtype=np.float64) * step
+    moves.setflags(write=False)
+    log_moves = np.log1p(moves)
+    log_moves.setflags(write=False)
+    return moves, log_moves
+
+
+def zero_crossings(spots: np.ndarray, values: np.ndarray) -> List[float]:
+    """Spots where `values` changes sign, linearly interpolated."""
+    sign = np.sign(values)
+    idx = np.flatnonzero(sign[:-1] * sign[1:] < 0)
+    exact = spots[sign == 0]
+    x0, x1 = spots[idx], spots[idx + 1]
+    y0, y1 = values[idx], values[idx + 1]
+    crossings = x0 - y0 * (x1 - x0) / (y1 - y0)
+    return sorted(np.concatenate([crossings, exact]).tolist())
+
+
+class ScenarioEngine:
+    """
+    Total GEX of a chain across a grid of hypothetical spots.
+
+    Gamma is Black-Scholes from each contract's IV, evaluated as one
+    contracts x grid array:
+        d1[i, j] = a[i] * ln(S_j) + b[i]
+        GEX(S_j) = S_j * sum_i w[i] * exp(-d1[i, j]^2 / 2)
+    Contracts without IV keep their vendor gamma at every spot. Contracts
+    are taken in row blocks of at most `block_elements` cells; the block's
+    scratch buffer is kept per thread and reused, so repeated calls do not
+    allocate it again and its size does not grow with the chain.
+    """
+
+    def __init__(self, rate: float = RISK_FREE_RATE, block_elements: int = SCENARIO_BLOCK_ELEMENTS):
+        self.rate = rate
+        self.block_elements = block_elements
+        self._local = threading.local()
+
+    def _scratch(self, n: int, m: int) -> np.ndarray:
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.size < n * m:
+            buf = self._local.buf = np.empty(n * m, dtype=np.float64)
+        return buf[:n * m].reshape(n, m)
+
+    def curve(self, chain: OptionChain, spots: np.ndarray, log_spots: np.ndarray,
+              now: Optional[float] = None) -> np.ndarray:
+        """Total GEX at each spot in `spots` (with `log_spots` = ln(spots))."""
+        sign = np.where(chain.is_put, -1.0, 1.0)
+        held = (chain.open_interest > 0) & (chain.gamma != 0.0)
+        priced = held & np.isfinite(chain.iv) & (chain.iv > 0) & (chain.strike > 0)
+        if not chain.expiration:
+            priced[:] = False
+
+        # Contracts without a usable IV: fixed gamma, GEX grows with S^2
+        fixed = held & ~priced
+        fixed_total = float(np.dot(sign[fixed] * chain.open_interest[fixed], chain.gamma[fixed]))
+        curve = fixed_total * _CONTRACT_SCALE * spots * spots
+
+        if priced.any():
+            t = years_to_expiry(chain.expiration, now)
+            iv = chain.iv[priced]
+            vol_t = iv * math.sqrt(t)
+            a = 1.0 / vol_t
+            b = (-np.log(chain.strike[priced]) + (self.rate + 0.5 * iv * iv) * t) * a
+            w = sign[priced] * chain.open_interest[priced] * _CONTRACT_SCALE * _INV_SQRT_2PI * a
+
+            total = np.zeros(len(spots))
+            rows = max(1, self.block_elements // len(spots))
+            for lo in range(0, len(a), rows):
+                hi = min(lo + rows, len(a))
+                d1 = self._scratch(hi - lo, len(spots))
+                np.multiply.outer(a[lo:hi], log_spots, out=d1)
+                d1 += b[lo:hi, None]
+                np.square(d1, out=d1)
+                d1 *= -0.5
+                np.exp(d1, out=d1)
+                total += w[lo:hi] @ d1
+            curve += total * spots
+        return curve
+
+    def run(self, chain: OptionChain, spot: float, width: float = SCENARIO_WIDTH,
+            step: float = SCENARIO_STEP, now: Optional[float] = None) -> Dict:
+        """
+        GEX curve over spot * (1 + move) for moves in [-width, width], and
+        the zero-gamma level: the sign change nearest to the current spot
+        (None if gamma does not flip within the grid).
+        """
+        moves, log_moves = _grid(width, step)
+        spots = spot * (1.0 + moves)
+        curve = self.curve(chain, spots, math.log(spot) + log_moves, now=now)
+        flips = zero_crossings(spots, curve)
+        zero_gamma = min(flips, key=lambda x: abs(x - spot)) if flips else None
+        return {
+            "spots": spots.tolist(),
+            "gex": curve.tolist(),
+            "zero_gamma": zero_gamma,
+            "flips": flips,
+        }
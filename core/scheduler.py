@@ -0,0 +1,105 @@
+# core/scheduler.py
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class _Job:
+    def __init__(self, key: str, interval: float, fn: Callable[[], Awaitable[Any]],
+                 jitter: float):
+        self.key = key
+        self.interval = interval
+        self.fn = fn
+        self.jitter = jitter
+        self.task: Optional[asyncio.Task] = None   # current run
+        self.loop_task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.skips = 0
+        self.failures = 0
+        self.last_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "running": self.task is not None and not self.task.done(),
+            "runs": self.runs,
+            "skips": self.skips,
+            "failures": self.failures,
+            "last_started": self.last_started,
+            "last_finished": self.last_finished,
+            "last_duration": round(self.last_duration, 4) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class RefreshScheduler:
+    """
+    Runs async refresh jobs on fixed cadences inside the service's event loop.
+
+    Each job ticks every `interval` seconds (plus/minus `jitter` as a fraction
+    of the interval, so jobs sharing a cadence do not fire in lockstep). If a
+    tick arrives while the previous run is still going, the tick is skipped
+    rather than queued.
+    """
+
+    def __init__(self, jitter: float = 0.1):
+        self.jitter = jitter
+        self._jobs: Dict[str, _Job] = {}
+        self._running = False
+
+    def add_job(self, key: str, interval: float, fn: Callable[[], Awaitable[Any]],
+                jitter: Optional[float] = None) -> None:
+        job = _Job(key, interval, fn, self.jitter if jitter is None else jitter)
+        self._jobs[key] = job
+        if self._running:
+            job.loop_task = asyncio.ensure_future(self._loop(job))
+
+    def start(self) -> None:
+        self._running = True
+        for job in self._jobs.values():
+            job.loop_task = asyncio.ensure_future(self._loop(job))
+
+    async def stop(self) -> None:
+        self._running = False
+        tasks: List[asyncio.Task] = []
+        for job in self._jobs.values():
+            for t in (job.loop_task, job.task):
+                if t is not None and not t.done():
+                    t.cancel()
+                    tasks.append(t)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _loop(self, job: _Job):
+        # Spread the first run of each job across one jitter window
+        await asyncio.sleep(random.uniform(0, job.jitter * job.interval))
+        while True:
+            if job.task is not None and not job.task.done():
+                job.skips += 1
+            else:
+                job.task = asyncio.ensure_future(self._run(job))
+            delay = job.interval * (1 + random.uniform(-job.jitter, job.jitter))
+            await asyncio.sleep(max(delay, 0.0))
+
+    async def _run(self, job: _Job):
+        job.last_started = time.time()
+        start = time.perf_counter()
+        try:
+            await job.fn()
+            job.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            print(f"GammaMaps Error [Scheduler/{job.key}]: {str(e)}")
+        finally:
+            job.runs += 1
+            job.last_duration = time.perf_counter() - start
+            job.last_finished = time.time()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {key: job.status() for key, job in self._jobs.items()}
@@ -0,0 +1,157 @@
+# core/stream.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Top-level fields whose changes are pushed alongside per-strike deltas
+SUMMARY_FIELDS = ("spot", "net_exposure", "environment", "king_node", "nearest_levels",
+                  "zero_gamma", "timestamp")
+# Latest results older than this are dropped (expired or unwatched expirations)
+STREAM_LATEST_TTL_SECONDS = 900
+STREAM_MAX_SYMBOLS = 256  # least recently published symbols are dropped beyond this
+
+
+def diff_nodes(prev: Dict[str, Any], cur: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Per-strike delta between two node results for the same expiration:
+    nodes that are new or changed, strikes that left the band, and the
+    summary fields that changed. None when only the timestamp moved.
+    """
+    prev_nodes = {n["strike"]: n for n in prev.get("all_nodes", [])}
+    cur_strikes = set()
+    changed = []
+    for n in cur.get("all_nodes", []):
+        cur_strikes.add(n["strike"])
+        if prev_nodes.get(n["strike"]) != n:
+            changed.append(n)
+    removed = [k for k in prev_nodes if k not in cur_strikes]
+    summary = {f: cur.get(f) for f in SUMMARY_FIELDS if cur.get(f) != prev.get(f)}
+
+    if not changed and not removed and set(summary) <= {"timestamp"}:
+        return None
+    return {"changed": changed, "removed": removed, "summary": summary}
+
+
+class Subscription:
+    """
+    One client's view of a symbol.
+
+    Publishes only flag the subscription as dirty; the client's own task
+    diffs the latest results against what it last sent. A slow consumer
+    therefore skips intermediate updates instead of queueing them.
+    """
+
+    def __init__(self, hub: "NodeStream", symbol: str, loop: asyncio.AbstractEventLoop):
+        self.hub = hub
+        self.symbol = symbol
+        self._loop = loop
+        self._event = asyncio.Event()
+        self._sent: Dict[str, Dict[str, Any]] = {}
+        self._pending = 0
+        self.dropped = 0
+
+    def notify(self):
+        # May be called from any thread; state is only touched on the loop
+        self._loop.call_soon_threadsafe(self._mark)
+
+    def _mark(self):
+        self._pending += 1
+        self._event.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """True if updates are pending, False on timeout (send a keepalive)."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        latest = self.hub.latest(self.symbol)
+        self._sent = dict(latest)
+        self._event.clear()
+        self._pending = 0
+        return {"type": "snapshot", "symbol": self.symbol, "expirations": latest}
+
+    def deltas(self) -> List[Dict[str, Any]]:
+        self._event.clear()
+        if self._pending > 1:
+            self.dropped += self._pending - 1
+        self._pending = 0
+
+        out = []
+        for exp, cur in self.hub.latest(self.symbol).items():
+            prev = self._sent.get(exp)
+            self._sent[exp] = cur
+            if prev is None:
+                out.append({"type": "snapshot", "symbol": self.symbol, "expiration": exp, "data": cur})
+                continue
+            if prev is cur:
+                continue
+            delta = diff_nodes(prev, cur)
+            if delta is not None:
+                out.append({"type": "delta", "symbol": self.symbol, "expiration": exp, **delta})
+        return out
+
+
+class NodeStream:
+    """
+    Latest node result per (symbol, expiration) plus live subscriptions.
+
+    Results expire after `ttl` seconds and at most `max_symbols` symbols
+    are kept, so symbols nobody builds any more do not pin their nodes.
+    """
+
+    def __init__(self, ttl: float = STREAM_LATEST_TTL_SECONDS, max_symbols: int = STREAM_MAX_SYMBOLS):
+        self.ttl = ttl
+        self.max_symbols = max_symbols
+        self._lock = threading.Lock()
+        # symbol -> expiration -> (published at, result)
+        self._latest: "OrderedDict[str, Dict[str, Tuple[float, Dict[str, Any]]]]" = OrderedDict()
+        self._subs: Dict[str, set] = {}
+
+    def publish(self, symbol: str, expiration: str, result: Dict[str, Any]):
+        with self._lock:
+            self._latest.setdefault(symbol, {})[expiration] = (time.monotonic(), result)
+            self._latest.move_to_end(symbol)
+            while len(self._latest) > self.max_symbols:
+                self._latest.popitem(last=False)
+            subs = list(self._subs.get(symbol, ()))
+        for sub in subs:
+            sub.notify()
+
+    def latest(self, symbol: str) -> Dict[str, Dict[str, Any]]:
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            entries = self._latest.get(symbol)
+            if not entries:
+                return {}
+            for exp in [e for e, (ts, _) in entries.items() if ts < cutoff]:
+                del entries[exp]
+            if not entries:
+                del self._latest[symbol]
+            return {exp: result for exp, (_, result) in entries.items()}
+
+    def subscribe(self, symbol: str) -> Subscription:
+        sub = Subscription(self, symbol, asyncio.get_running_loop())
+        with self._lock:
+            self._subs.setdefault(symbol, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subs.get(sub.symbol)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.symbol]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "symbols": len(self._latest),
+                "subscribers": {s: len(subs) for s, subs in self._subs.items()},
+                "dropped_updates": sum(sub.dropped for subs in self._subs.values() for sub in subs),
+            }
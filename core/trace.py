@@ -0,0 +1,151 @@
+# core/trace.py
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from core.metrics import STAGE_SECONDS
+
+TRACE_KEEP = 50          # slowest requests kept
+TRACE_MAX_AGE = 600.0    # seconds a kept trace stays eligible
+
+# The trace of the request being served, if tracing is on. Everything below
+# checks this first, so with tracing off a span costs one ContextVar.get().
+_CURRENT: ContextVar[Optional["Trace"]] = ContextVar("gammamaps_trace", default=None)
+
+
+class Trace:
+    """Spans recorded while serving one request, relative to its start."""
+
+    __slots__ = ("name", "started", "wall_start", "duration", "status", "spans")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.wall_start = time.time()
+        self.duration = 0.0
+        self.status = None
+        self.spans: List[Tuple] = []
+
+    def add(self, name: str, start: float, end: float, attrs: Dict):
+        # list.append is atomic, so worker threads can add spans concurrently
+        self.spans.append((name, start - self.started, end - start,
+                           threading.current_thread().name, attrs))
+
+    def as_dict(self) -> Dict:
+        spans = sorted(self.spans, key=lambda s: s[1])
+        return {
+            "name": self.name,
+            "status": self.status,
+            "timestamp": self.wall_start,
+            "duration_ms": round(self.duration * 1e3, 3),
+            "spans": [
+                {"name": n, "start_ms": round(s * 1e3, 3), "duration_ms": round(d * 1e3, 3),
+                 "thread": t, **attrs}
+                for n, s, d, t, attrs in spans
+            ],
+        }
+
+
+def add_span(name: str, start: float, end: float, **attrs):
+    """Record an already-timed span (perf_counter bounds) on the current trace."""
+    trace = _CURRENT.get()
+    if trace is not None:
+        trace.add(name, start, end, attrs)
+
+
+class span:
+    """Context manager timing a block as a span of the current trace."""
+
+    __slots__ = ("name", "attrs", "trace", "start")
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.trace = _CURRENT.get()
+        if self.trace is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace is not None:
+            self.trace.add(self.name, self.start, time.perf_counter(), self.attrs)
+
+
+class stage:
+    """
+    Time one build stage: always observed in STAGE_SECONDS, and recorded
+    as a span when the request is being traced.
+    """
+
+    __slots__ = ("symbol", "name", "start")
+
+    def __init__(self, symbol: str, name: str):
+        self.symbol = symbol
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        STAGE_SECONDS.observe(end - self.start, self.symbol, self.name)
+        trace = _CURRENT.get()
+        if trace is not None:
+            trace.add(self.name, self.start, end, {"symbol": self.symbol})
+
+
+class Tracer:
+    """
+    Opt-in per-request tracing. Finished traces compete for a bounded set
+    of the slowest requests seen in the last `max_age` seconds.
+    """
+
+    def __init__(self, enabled: bool = False, keep: int = TRACE_KEEP, max_age: float = TRACE_MAX_AGE):
+        self.enabled = enabled
+        self.keep = keep
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._kept: List[Trace] = []
+        self.traced = 0
+
+    def begin(self, name: str):
+        """Start tracing a request; returns a handle for end(), or None when off."""
+        if not self.enabled:
+            return None
+        trace = Trace(name)
+        return trace, _CURRENT.set(trace)
+
+    def end(self, handle, status: int = None):
+        trace, token = handle
+        _CURRENT.reset(token)
+        trace.duration = time.perf_counter() - trace.started
+        trace.status = status
+        with self._lock:
+            self.traced += 1
+            if len(self._kept) >= self.keep:
+                self._prune()
+            if len(self._kept) < self.keep:
+                self._kept.append(trace)
+            elif trace.duration > self._kept[-1].duration:
+                self._kept[-1] = trace
+
+    def _prune(self):
+        # Caller holds self._lock; leaves the list slowest first
+        cutoff = time.time() - self.max_age
+        fresh = [t for t in self._kept if t.wall_start >= cutoff]
+        fresh.sort(key=lambda t: t.duration, reverse=True)
+        self._kept = fresh[:self.keep]
+
+    def slowest(self, limit: int = None) -> List[Dict]:
+        with self._lock:
+            self._prune()
+            kept = list(self._kept)
+        return [t.as_dict() for t in kept[:limit]]
+
+    def clear(self):
+        with self._lock:
+            self._kept = []
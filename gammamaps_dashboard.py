@@ -1,15 +1,24 @@
 import streamlit as st
 import requests
-import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from streamlit_autorefresh import st_autorefresh
 from datetime import datetime
 
 # --- CONFIG ---
-API_URL = "http://127.0.0.1:8051/nodes"
-EXPIRATIONS_URL = "http://127.0.0.1:8051/expirations"
+SURFACE_URL = "http://127.0.0.1:8051/surface"
 AVAILABLE_SYMBOLS = ["SPX", "SPY", "QQQ", "IWM", "GLD"]
 REFRESH_INTERVAL = 15 * 1000  # ms
+# Widget-triggered reruns inside this window reuse the last fetch
+FETCH_TTL_SECONDS = REFRESH_INTERVAL // 1000 - 1
+
+# Heatmap strength buckets (normalised |GEX|) -> green scale, light to dark
+STRENGTH_BINS = [0.05, 0.15, 0.30, 0.45, 0.60, 0.75, 0.90]
+STRENGTH_COLORS = np.array(
+    ["#E8F5E9", "#C8E6C9", "#A5D6A7", "#66BB6A", "#4CAF50", "#388E3C", "#2E7D32", "#1B5E20"]
+)
+KING_COLOR = "#4B007F"
+EMPTY_COLOR = "#121212"
 
 st.set_page_config(
     page_title="GammaMaps",
@@ -290,46 +299,50 @@ with control_col3:
 
 st.write("")
 
-# --- FETCH EXPIRATIONS ---
-try:
-    resp = requests.get(EXPIRATIONS_URL, params={"symbol": selected_symbol}, timeout=5)
+# --- FETCH STRIKE x EXPIRY SURFACE (single call) ---
+@st.cache_resource
+def _surface_etags():
+    # symbol -> (ETag, surface) of the last full response
+    return {}
+
+
+@st.cache_data(ttl=FETCH_TTL_SECONDS, show_spinner=False)
+def fetch_surface(symbol):
+    # An unchanged surface comes back as an empty 304 and the last
+    # body is reused. Errors raise, so they are never cached.
+    etags = _surface_etags()
+    cached_etag, cached_surface = etags.get(symbol, (None, {}))
+    headers = {"If-None-Match": cached_etag} if cached_etag else {}
+    resp = requests.get(SURFACE_URL, params={"symbol": symbol}, headers=headers, timeout=30)
+    if resp.status_code == 304:
+        return cached_surface
     resp.raise_for_status()
-    expirations = resp.json().get("expirations", [])
+    surface = resp.json()
+    etags[symbol] = (resp.headers.get("ETag"), surface)
+    return surface
+
+
+try:
+    surface = fetch_surface(selected_symbol)
 except Exception:
-    expirations = []
+    surface = {}
 
+expirations = surface.get("expirations", [])
 if not expirations:
     st.error("No expirations available from backend.")
     st.stop()
 
-# --- FETCH NODES FOR EACH EXPIRY ---
-expiry_data = {}
-for exp in expirations:
-    try:
-        r = requests.get(API_URL, params={"symbol": selected_symbol, "expiration": exp}, timeout=8)
-        if r.status_code == 200:
-            expiry_data[exp] = r.json()
-        else:
-            expiry_data[exp] = {}
-    except Exception:
-        expiry_data[exp] = {}
+sorted_strikes = surface.get("strikes", [])
+gex_matrix = surface.get("gex", [])
+summaries = surface.get("summaries", [])
+spot = surface.get("spot", 0) or 0
 
 # --- CONFLUENCE WIDGET ---
-first_exp_data = expiry_data.get(expirations[0], {})
-net_gex = first_exp_data.get("net_exposure", 0) or 0
+first_summary = summaries[0] if summaries else {}
+net_gex = first_summary.get("net_exposure", 0) or 0
 
-# Determine a highlight strike for styling (front-expiry king level if available)
-highlight_strike = None
-first_nodes = first_exp_data.get("all_nodes", [])
-if isinstance(first_nodes, list) and first_nodes:
-    try:
-        df_first = pd.DataFrame(first_nodes)
-        if "strike" in df_first.columns and "is_king" in df_first.columns:
-            kings = df_first[df_first["is_king"] == True]
-            if not kings.empty:
-                highlight_strike = float(kings.iloc[0]["strike"])
-    except Exception:
-        highlight_strike = None
+# Highlight strike for styling (front-expiry king level if available)
+highlight_strike = first_summary.get("king_node")
 
 glow_style = "border: 1px solid rgba(255, 255, 255, 0.1);"
 status_msg = f"{selected_symbol} MARKET STATE: NEUTRAL"
@@ -344,7 +357,9 @@ elif net_gex < 0:
     status_msg = f"{selected_symbol} MARKET STATE: NEGATIVE GEX (HIGH VOL)"
     status_color = "#d500f9"
 
-last_updated = first_exp_data.get("last_updated", "")
+last_updated = ""
+if surface.get("timestamp"):
+    last_updated = datetime.fromtimestamp(surface["timestamp"]).strftime("%H:%M:%S")
 
 st.markdown(
     f"""
@@ -367,7 +382,7 @@ st.markdown(
             </div>
             <div class="ticker-pill">
                 <span class="label">Spot</span>
-                <span style="font-weight: 700;">${first_exp_data.get("spot", 0):,.2f}</span>
+                <span style="font-weight: 700;">${spot:,.2f}</span>
             </div>
             <div class="ticker-pill">
                 <span class="label">Live</span>
@@ -387,7 +402,7 @@ st.markdown(
         <div style="display: flex; justify-content: center; gap: 30px; margin-top: 10px;
                     font-family: 'Roboto Mono'; font-size: 14px; color: #aaa;">
             <span>NET GEX (0DTE): {net_gex/1e9:+.2f}B</span>
-            <span>SPOT: ${first_exp_data.get("spot", 0):,.2f}</span>
+            <span>SPOT: ${spot:,.2f}</span>
         </div>
     </div>
     """,
@@ -395,93 +410,47 @@ st.markdown(
 )
 
 # --- BUILD COMBINED TABLE DATA ---
-all_strikes = set()
-for exp in expirations:
-    data = expiry_data.get(exp, {})
-    nodes = data.get("all_nodes", [])
-    if nodes:
-        df_tmp = pd.DataFrame(nodes)
-        all_strikes.update(df_tmp["strike"].tolist())
-
-sorted_strikes = sorted(list(all_strikes), reverse=True)
-strike_col = [f"{s:.1f}" for s in sorted_strikes]
+# One aligned strike x expiry array; every cell is labelled and coloured
+# with whole-array operations.
+strikes_arr = np.asarray(sorted_strikes, dtype=float)
+n_strikes, n_exps = len(strikes_arr), len(expirations)
+gex_arr = np.asarray(gex_matrix, dtype=float).reshape(n_strikes, n_exps)  # None -> NaN
+present = ~np.isnan(gex_arr)
+
+available = np.array([bool(s.get("available")) for s in summaries] + [False] * (n_exps - len(summaries)))
+available &= present.any(axis=0)
+kings = np.array(
+    [s.get("king_node") if s.get("king_node") is not None else np.nan for s in summaries]
+    + [np.nan] * (n_exps - len(summaries)),
+    dtype=float,
+)
 
-exp_columns = []
-exp_colors = []
+# Normalize absolute GEX per expiry into [0, 1] so stronger levels -> darker colors
+abs_gex = np.abs(gex_arr)
+with np.errstate(all="ignore"):
+    col_max = np.nanmax(np.where(present, abs_gex, np.nan), axis=0) if n_strikes else np.zeros(n_exps)
+    col_min = np.nanmin(np.where(present, abs_gex, np.nan), axis=0) if n_strikes else np.zeros(n_exps)
+    spread = col_max - col_min
+    strength_pct = np.where(spread > 0, (abs_gex - col_min) / spread, 0.0)
+
+is_king = strikes_arr[:, None] == kings[None, :]
+cell_colors = STRENGTH_COLORS[np.digitize(np.nan_to_num(strength_pct), STRENGTH_BINS, right=True)]
+cell_colors = np.where(is_king, KING_COLOR, cell_colors)
+cell_colors = np.where(present, cell_colors, EMPTY_COLOR)
+
+format_k = np.frompyfunc("${:,.1f}K".format, 1, 1)
+cell_text = format_k(np.nan_to_num(gex_arr) / 1e3).astype(str)
+near_spot = np.abs(strikes_arr - spot) < 2.5
+cell_text = np.char.add(cell_text, np.where(near_spot[:, None] & present, " ▶", ""))
+cell_text = np.char.add(cell_text, np.where(is_king & present, " ⭐", ""))
+
+# Expiries with no data render as a column of N/A
+cell_text[:, ~available] = "N/A"
+cell_colors[:, ~available] = EMPTY_COLOR
 
-for exp in expirations:
-    data = expiry_data.get(exp, {})
-    spot = data.get("spot", 0)
-    nodes = data.get("all_nodes", [])
-
-    if not nodes:
-        exp_columns.append(["N/A"] * len(sorted_strikes))
-        exp_colors.append(["#121212"] * len(sorted_strikes))
-        continue
-
-    df = pd.DataFrame(nodes)
-    if "gex" not in df.columns:
-        df["gex"] = df["strength"] * 1e6
-
-    gex_values = df["gex"].abs()
-    max_gex = gex_values.max()
-    min_gex = gex_values.min()
-
-    strike_map = {row["strike"]: row for _, row in df.iterrows()}
-
-    col_values = []
-    col_colors = []
-
-    for strike in sorted_strikes:
-        if strike in strike_map:
-            row = strike_map[strike]
-            val = row["gex"]
-
-            txt = f"${val/1e3:,.1f}K"
-            if abs(strike - spot) < 2.5:
-                txt += " ▶"
-            if row.get("is_king"):
-                txt += " ⭐"
-
-            col_values.append(txt)
-
-            abs_val = abs(val)
-
-            # Normalize absolute GEX value into [0, 1] so stronger levels -> darker colors
-            if max_gex > min_gex:
-                strength_pct = (abs_val - min_gex) / (max_gex - min_gex)
-            else:
-                strength_pct = 0.0
-
-            # Special styling for "king" levels – deep purple bar
-            if row.get("is_king"):
-                col_colors.append("#4B007F")
-            else:
-                # Single green color scale: stronger level => darker green
-                if strength_pct > 0.90:
-                    base_color = "#1B5E20"
-                elif strength_pct > 0.75:
-                    base_color = "#2E7D32"
-                elif strength_pct > 0.60:
-                    base_color = "#388E3C"
-                elif strength_pct > 0.45:
-                    base_color = "#4CAF50"
-                elif strength_pct > 0.30:
-                    base_color = "#66BB6A"
-                elif strength_pct > 0.15:
-                    base_color = "#A5D6A7"
-                elif strength_pct > 0.05:
-                    base_color = "#C8E6C9"
-                else:
-                    base_color = "#E8F5E9"
-
-                col_colors.append(base_color)
-        else:
-            col_values.append("$0.0K")
-            col_colors.append("#121212")
-
-    exp_columns.append(col_values)
-    exp_colors.append(col_colors)
+strike_col = [f"{s:.1f}" for s in sorted_strikes]
+exp_columns = cell_text.T.tolist()
+exp_colors = cell_colors.T.tolist()
 
 # --- LABELS FOR EXPIRATIONS ---
 exp_labels = []
@@ -494,12 +463,10 @@ for exp in expirations:
 
 all_values = [strike_col] + exp_columns
 
-strike_colors = []
-for s in sorted_strikes:
-    if highlight_strike is not None and abs(s - highlight_strike) < 1e-6:
-        strike_colors.append("#FFFFFF")
-    else:
-        strike_colors.append("#000000")
+if highlight_strike is not None:
+    strike_colors = np.where(np.abs(strikes_arr - highlight_strike) < 1e-6, "#FFFFFF", "#000000").tolist()
+else:
+    strike_colors = ["#000000"] * n_strikes
 
 all_colors = [strike_colors] + exp_colors
 
@@ -537,7 +504,6 @@ fig.update_layout(
 st.plotly_chart(fig, use_container_width=True)
 
 # --- BOTTOM TICKER BAR ---
-spot = first_exp_data.get("spot", 0)
 st.markdown(
     f"""
     <div class="bottom-bar">
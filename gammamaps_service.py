@@ -1,70 +1,1021 @@
+import asyncio
+import hmac
+import multiprocessing
+import os
+import threading
 import time
-from typing import Dict, Any, Optional
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from core.data import (
+    LIMITER,
+    get_spot,
+    get_expirations,
+    get_options_chain,
+    get_spot_async,
+    get_expirations_async,
+    get_options_chains_async,
+)
+from core.archive import SnapshotArchive
+from core.cache import FRESH, STALE, SingleFlight, TTLCache
+from core.calc import exposure_arrays, profile_arrays, smooth_array
+from core.chain import OptionChain
+from core.client import get_client
+from core.greeks import expiry_timestamp, local_gamma
+from core.history import capacity_for
+from core.memo import MEMO
+from core.metrics import HTTP_SECONDS, PAYLOAD_BYTES, REGISTRY
+from core.nodes import HISTORY, extract_nodes_arrays
+from core.payload import Payload, dumps, payload_size
+from core.profiler import PROFILE_INTERVAL, PROFILE_MAX_SECONDS, SamplingProfiler
+from core.ratelimit import BACK, BACKGROUND, FRONT, current_priority, priority
+from core.scenario import ScenarioEngine
+from core.scheduler import RefreshScheduler
+from core.stream import NodeStream
+from core.trace import Tracer, add_span, stage
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if HISTORY_PATH and os.path.exists(HISTORY_PATH):
+        HISTORY.load(HISTORY_PATH)
+    if ARCHIVE is not None:
+        ARCHIVE.start()
+    SCHEDULER.start()
+    yield
+    await SCHEDULER.stop()
+    if ARCHIVE is not None:
+        await asyncio.to_thread(ARCHIVE.stop)
+    if _COMPUTE is not None:
+        _COMPUTE.shutdown(wait=False, cancel_futures=True)
+    if HISTORY_PATH:
+        HISTORY.save(HISTORY_PATH)
 
-from core.data import get_spot, get_expirations, get_options_chain
-from core.calc import compute_exposure, smooth_profile
-from core.nodes import extract_nodes
 
 # Rebranded API title
-app = FastAPI(title="GammaMaps API", version="2.0.0")
+app = FastAPI(title="GammaMaps API", version="2.0.0", lifespan=lifespan)
 
-CACHE: Dict[str, Dict[str, Any]] = {}
 CACHE_TTL_SECONDS = 30
+# Stale results are served for this long after the TTL while one refresh runs
+CACHE_STALE_SECONDS = int(os.environ.get("GAMMAMAPS_CACHE_STALE_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.environ.get("GAMMAMAPS_CACHE_MAX_ENTRIES", "512"))
+CACHE_MAX_BYTES = int(os.environ.get("GAMMAMAPS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
 
+CACHE = TTLCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+    ttl=CACHE_TTL_SECONDS,
+    stale_ttl=CACHE_STALE_SECONDS,
+    sizeof=payload_size,
+)
 
-def build_nodes(symbol: str, expiration: str = None) -> dict:
-    """
-    Build GEX nodes for a given symbol and expiration.
-    If expiration is None, uses the nearest expiration.
-    """
-    spot = get_spot(symbol)
-    expirations = get_expirations(symbol)
+# Responses at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = int(os.environ.get("GAMMAMAPS_GZIP_MIN_BYTES", "1024"))
+
+# In-flight build deduplication shared by all cache lookups
+FLIGHTS = SingleFlight()
+
+EXPIRATIONS_TTL_SECONDS = 300
+
+# Profile smoothing (see core.calc.smooth_array). The defaults reproduce the
+# original 3-strike moving average.
+SMOOTH_WINDOW = float(os.environ.get("GAMMAMAPS_SMOOTH_WINDOW", "1"))
+SMOOTH_KERNEL = os.environ.get("GAMMAMAPS_SMOOTH_KERNEL", "box")
+SMOOTH_BY = os.environ.get("GAMMAMAPS_SMOOTH_BY", "index")
+
+# RoC compares against the snapshot this many seconds old (0 = previous build)
+ROC_LOOKBACK_SECONDS = float(os.environ.get("GAMMAMAPS_ROC_LOOKBACK_SECONDS", "0"))
+# Intraday history is saved here on shutdown and reloaded on startup
+HISTORY_PATH = os.environ.get("GAMMAMAPS_HISTORY_PATH")
+
+# Pre-warming cadence (see GAMMAMAPS_WATCHLIST below)
+DEFAULT_REFRESH_SECONDS = 15
+FRONT_EXPIRIES = int(os.environ.get("GAMMAMAPS_FRONT_EXPIRIES", "2"))
+BACK_INTERVAL_MULTIPLIER = 4
+EXPIRATIONS_REFRESH_SECONDS = 300
+
+# Tiered refresh (on when GAMMAMAPS_CHAIN_TTL_SECONDS > 0): chains are fetched
+# at most every CHAIN_TTL_SECONDS, spot every SPOT_TTL_SECONDS, and between
+# chain pulls gamma is recomputed locally from the chain's IV at current
+# spot, so nodes track spot without refetching chains.
+CHAIN_TTL_SECONDS = float(os.environ.get("GAMMAMAPS_CHAIN_TTL_SECONDS", "0"))
+SPOT_TTL_SECONDS = float(os.environ.get("GAMMAMAPS_SPOT_TTL_SECONDS", "1"))
+TIERED = CHAIN_TTL_SECONDS > 0
+# Node / surface entries only live as long as the spot they were built on
+NODES_TTL_SECONDS = max(SPOT_TTL_SECONDS, 0.5) if TIERED else None
+# Tiered node entries are rebuilt in-process from held chains, so a stale
+# one is rebuilt inline instead of served: with a ~1 s TTL, serving stale
+# would always hand unwatched keys the previous poll's build
+NODES_SERVE_STALE = not TIERED
+
+# Raw chains and spots for the tiered mode; a stale chain is kept for one
+# more TTL as a fallback when its refetch fails
+CHAINS = TTLCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=int(os.environ.get("GAMMAMAPS_CHAIN_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    ttl=CHAIN_TTL_SECONDS,
+    stale_ttl=CHAIN_TTL_SECONDS,
+    sizeof=lambda chain: chain.nbytes,
+)
+SPOTS = TTLCache(max_entries=CACHE_MAX_ENTRIES, ttl=SPOT_TTL_SECONDS, stale_ttl=0,
+                 sizeof=lambda spot: 8)
+
+# Parquet archive of every fetched chain and computed profile (off unless set)
+ARCHIVE_DIR = os.environ.get("GAMMAMAPS_ARCHIVE_DIR")
+ARCHIVE = SnapshotArchive(ARCHIVE_DIR) if ARCHIVE_DIR else None
+
+# Worker processes for /nodes/batch profile math (0 computes in-process)
+COMPUTE_WORKERS = int(os.environ.get("GAMMAMAPS_COMPUTE_WORKERS", str(os.cpu_count() or 1)))
+MAX_BATCH_SYMBOLS = int(os.environ.get("GAMMAMAPS_MAX_BATCH_SYMBOLS", "25"))
+_COMPUTE: Optional[ProcessPoolExecutor] = None
+
+# MEMO holds stage outputs keyed by (chain fingerprint, spot, parameters), so
+# an unchanged chain skips exposure, smoothing, extraction (and its RoC
+# update) and the scenario grid; GAMMAMAPS_MEMO_MAX_ENTRIES=0 turns it off
+SMOOTH_PARAMS = (SMOOTH_WINDOW, SMOOTH_KERNEL, SMOOTH_BY)
+
+# Spot-shock grid for the zero-gamma level on /nodes and the /scenario curve
+SCENARIO_WIDTH = float(os.environ.get("GAMMAMAPS_SCENARIO_WIDTH", "0.10"))
+SCENARIO_STEP = float(os.environ.get("GAMMAMAPS_SCENARIO_STEP", "0.001"))
+MAX_SCENARIO_POINTS = 2001
+SCENARIOS = ScenarioEngine()
+
+# Live node results for /stream subscribers
+STREAM = NodeStream()
+STREAM_KEEPALIVE_SECONDS = 15
 
+# Opt-in request tracing (slowest recent requests) and admin-only profiling;
+# admin endpoints are disabled unless GAMMAMAPS_ADMIN_TOKEN is set
+TRACER = Tracer(enabled=os.environ.get("GAMMAMAPS_TRACING", "").lower() in ("1", "true", "yes"))
+ADMIN_TOKEN = os.environ.get("GAMMAMAPS_ADMIN_TOKEN")
+_PROFILER: Optional[SamplingProfiler] = None
+
+# Background revalidation of stale entries
+_REFRESHER = ThreadPoolExecutor(max_workers=4, thread_name_prefix="revalidate")
+_REFRESH_TASKS = set()
+# Keys with a revalidation queued or running, so a burst of stale hits
+# schedules one refresh rather than one per hit
+_REVALIDATING = set()
+_REVALIDATING_LOCK = threading.Lock()
+
+
+def _payload(kind: str, symbol: str, data: Any) -> Payload:
+    """Encode a response once, recording encode time and body size."""
+    with stage(symbol, "encode"):
+        payload = Payload(data)
+    PAYLOAD_BYTES.observe(len(payload), kind)
+    return payload
+
+
+def _payload_for_key(cache_key: str, data: Any) -> Payload:
+    # Cache keys are "<SYMBOL>_<expiration|default|surface|expirations|scenario_...>"
+    symbol, _, rest = cache_key.partition("_")
+    kind = rest.partition("_")[0]
+    return _payload(kind if kind in ("surface", "expirations", "scenario") else "nodes", symbol, data)
+
+
+def _select_expiration(expirations: List[str], expiration: str = None) -> str:
     # Use provided expiration or default to first (nearest)
     if expiration and expiration in expirations:
-        selected_exp = expiration
-    else:
-        selected_exp = expirations[0]
+        return expiration
+    return expirations[0]
+
 
-    options = get_options_chain(symbol, selected_exp)
-    raw_profile = compute_exposure(options, spot)
-    profile = smooth_profile(raw_profile, window=1)
+def _expiry_priorities(expirations: List[str], selected: List[str]) -> Dict[str, int]:
+    """
+    Vendor priority per selected expiration: FRONT for the nearest
+    FRONT_EXPIRIES, BACK after that, and never above the caller's own
+    priority (so background rebuilds stay in the background).
+    """
+    floor = current_priority()
+    front = set(expirations[:FRONT_EXPIRIES])
+    return {exp: max(FRONT if exp in front else BACK, floor) for exp in selected}
 
-    nodes = extract_nodes(profile, spot, symbol=symbol)
+
+def _spot(symbol: str) -> float:
+    if not TIERED:
+        return get_spot(symbol)
+    value, state = SPOTS.lookup(symbol)
+    if state == FRESH:
+        return value
+    return FLIGHTS.do(f"spot:{symbol}", lambda: _store_spot(symbol, get_spot(symbol)))
+
+
+async def _spot_async(symbol: str) -> float:
+    if not TIERED:
+        return await get_spot_async(symbol)
+    value, state = SPOTS.lookup(symbol)
+    if state == FRESH:
+        return value
+
+    async def fetch():
+        return _store_spot(symbol, await get_spot_async(symbol))
+
+    return await FLIGHTS.do_async(f"spot:{symbol}", fetch)
+
+
+def _expirations(symbol: str) -> List[str]:
+    """
+    The expiration list from the shared {symbol}_expirations entry (the one
+    /expirations and the watchlist keep warm); the vendor only on a miss.
+    """
+    payload = _cached(f"{symbol}_expirations",
+                      lambda: {"symbol": symbol, "expirations": get_expirations(symbol)},
+                      ttl=EXPIRATIONS_TTL_SECONDS)
+    return payload.data["expirations"]
+
+
+async def _expirations_async(symbol: str) -> List[str]:
+    return (await get_cached_expirations(symbol)).data["expirations"]
+
+
+def _store_spot(symbol: str, spot: float) -> float:
+    SPOTS.set(symbol, spot)
+    return spot
+
+
+def _archive_chain(symbol: str, spot: float, chain):
+    # Archived once per vendor fetch, as fetched (before any local repricing)
+    if ARCHIVE is not None and isinstance(chain, OptionChain):
+        ARCHIVE.add_chain(symbol, spot, chain)
+
+
+def _chain(symbol: str, spot: float, expiration: str):
+    """A chain no older than CHAIN_TTL_SECONDS in tiered mode, else a fresh fetch."""
+    if not TIERED:
+        chain = get_options_chain(symbol, expiration)
+        _archive_chain(symbol, spot, chain)
+        return chain
+    key = f"{symbol}_{expiration}"
+    value, state = CHAINS.lookup(key)
+    if state == FRESH:
+        return value
+
+    def fetch():
+        chain = get_options_chain(symbol, expiration)
+        CHAINS.set(key, chain)
+        _archive_chain(symbol, spot, chain)
+        return chain
+
+    try:
+        return FLIGHTS.do(f"chain:{key}", fetch)
+    except Exception:
+        if value is None:
+            raise
+        return value
+
+
+async def _chains_async(symbol: str, spot: float, expirations: List[str],
+                        priorities: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Async counterpart of _chain for several expirations; values are chains
+    or the Exception raised fetching them, as get_options_chains_async.
+    """
+    if not TIERED:
+        chains = await get_options_chains_async(symbol, expirations, priorities=priorities)
+        for chain in chains.values():
+            _archive_chain(symbol, spot, chain)
+        return chains
+    chains, stale, missing = {}, {}, []
+    for exp in expirations:
+        value, state = CHAINS.lookup(f"{symbol}_{exp}")
+        if state == FRESH:
+            chains[exp] = value
+        else:
+            missing.append(exp)
+            if value is not None:
+                stale[exp] = value
+
+    fetched = await get_options_chains_async(symbol, missing, priorities=priorities)
+    for exp, chain in fetched.items():
+        if not isinstance(chain, Exception):
+            CHAINS.set(f"{symbol}_{exp}", chain)
+            _archive_chain(symbol, spot, chain)
+        elif exp in stale:
+            chain = stale[exp]
+        chains[exp] = chain
+    return {exp: chains[exp] for exp in expirations}
+
+
+def _priced(symbol: str, spot: float, options):
+    """In tiered mode, reprice the chain's gamma at the current spot and time."""
+    if not TIERED or not isinstance(options, OptionChain):
+        return options
+    with stage(symbol, "gamma"):
+        return options.with_gamma(local_gamma(options, spot))
+
+
+def _memo_key(options, spot: float) -> Optional[tuple]:
+    """Input fingerprint shared by every stage of one build; None skips MEMO."""
+    if MEMO.max_entries <= 0 or not isinstance(options, OptionChain):
+        return None
+    return options.fingerprint(), spot
+
+
+def _nodes_from_chain(symbol: str, spot: float, expiration: str, options) -> Optional[dict]:
+    """
+    Build GEX nodes for one expiration from an already-fetched spot and chain.
+    Returns None when the chain carries no usable exposure.
+    """
+    options = _priced(symbol, spot, options)
+    key = _memo_key(options, spot)
+    with stage(symbol, "exposure"):
+        strikes, raw_gex = MEMO.get_or_compute("exposure", key, lambda: exposure_arrays(options, spot))
+    with stage(symbol, "smooth"):
+        gex = MEMO.get_or_compute(
+            "smooth", key and key + SMOOTH_PARAMS,
+            lambda: smooth_array(strikes, raw_gex, window=SMOOTH_WINDOW, kernel=SMOOTH_KERNEL, by=SMOOTH_BY),
+        )
+    return _nodes_from_profile(symbol, spot, expiration, options, strikes, raw_gex, gex, key=key)
+
+
+def _nodes_from_profile(symbol: str, spot: float, expiration: str, options,
+                        strikes, raw_gex, gex, key: Optional[tuple] = None) -> Optional[dict]:
+    """
+    Extract nodes from an already-computed (and smoothed) profile. Runs in
+    this process since RoC history, the archive and the stream live here.
+    With a memo `key`, a build repeating the inputs of the last one
+    recorded for this expiration reuses its nodes without recording
+    another RoC snapshot; any build in between changes the history marker
+    in the key, so the nodes are recomputed against the right reference.
+    """
+    if ARCHIVE is not None:
+        ARCHIVE.add_profile(symbol, expiration, spot, strikes, raw_gex, gex)
+
+    extract_key = key and key + SMOOTH_PARAMS + (symbol, expiration, ROC_LOOKBACK_SECONDS)
+    with stage(symbol, "extract"):
+        hit, nodes = MEMO.lookup(
+            "extract", extract_key and extract_key + (HISTORY.marker(symbol, expiration, ROC_LOOKBACK_SECONDS),))
+        if not hit:
+            nodes = extract_nodes_arrays(strikes, gex, spot, symbol=symbol,
+                                         expiration=expiration, lookback=ROC_LOOKBACK_SECONDS)
+            # Keyed by the history state this build leaves behind, which is
+            # what a repeat of the same inputs will see
+            MEMO.store("extract", extract_key and extract_key + (
+                HISTORY.marker(symbol, expiration, ROC_LOOKBACK_SECONDS),), nodes)
+    if nodes is None:
+        return None
+
+    zero_gamma = None
+    if isinstance(options, OptionChain):
+        with stage(symbol, "scenario"):
+            zero_gamma = MEMO.get_or_compute(
+                "scenario", key and key + (SCENARIO_WIDTH, SCENARIO_STEP, _minutes_to_expiry(options)),
+                lambda: SCENARIOS.run(options, spot, SCENARIO_WIDTH, SCENARIO_STEP)["zero_gamma"],
+            )
 
     result = {
         "symbol": symbol,
         "spot": round(spot, 2),
-        "expiration": selected_exp,
+        "expiration": expiration,
         "timestamp": int(time.time()),
         **nodes,
+        "zero_gamma": round(zero_gamma, 2) if zero_gamma is not None else None,
     }
+    STREAM.publish(symbol, expiration, result)
+    return result
+
+
+def _minutes_to_expiry(options: OptionChain) -> Optional[int]:
+    # The scenario grid reprices at the current time to expiry, so its memo
+    # entries only hold within a minute of it
+    if not options.expiration:
+        return None
+    return int((expiry_timestamp(options.expiration) - time.time()) // 60)
 
+
+def _build_expiration(symbol: str, spot: float, expiration: str) -> Optional[dict]:
+    options = _chain(symbol, spot, expiration)
+    return _nodes_from_chain(symbol, spot, expiration, options)
+
+
+def build_nodes(symbol: str, expiration: str = None) -> dict:
+    """
+    Build GEX nodes for a given symbol and expiration.
+    If expiration is None, uses the nearest expiration.
+    """
+    spot = _spot(symbol)
+    expirations = _expirations(symbol)
+    selected_exp = _select_expiration(expirations, expiration)
+
+    with priority(_expiry_priorities(expirations, [selected_exp])[selected_exp]):
+        result = _build_expiration(symbol, spot, selected_exp)
+    if result is None:
+        raise RuntimeError(f"No gamma exposure available for {symbol} {selected_exp}")
     return result
 
 
-def get_cached_or_build(symbol: str, expiration: str = None) -> Dict[str, Any]:
+def build_scenario(symbol: str, expiration: str = None, width: float = SCENARIO_WIDTH,
+                   step: float = SCENARIO_STEP) -> dict:
     """
-    Returns cached data if fresh, otherwise builds new data.
+    Total GEX across spot shocks of +/- `width` in `step` increments for
+    one expiration, with the interpolated zero-gamma (flip) levels.
+    """
+    spot = _spot(symbol)
+    expirations = _expirations(symbol)
+    selected_exp = _select_expiration(expirations, expiration)
+    with priority(_expiry_priorities(expirations, [selected_exp])[selected_exp]):
+        options = _chain(symbol, spot, selected_exp)
+    with stage(symbol, "scenario"):
+        curve = SCENARIOS.run(options, spot, width, step)
+    return {
+        "symbol": symbol,
+        "spot": round(spot, 2),
+        "expiration": selected_exp,
+        "timestamp": int(time.time()),
+        "width": width,
+        "step": step,
+        **curve,
+    }
+
+
+async def build_surface_async(symbol: str) -> dict:
+    """
+    Build a dense strike x expiration GEX matrix for every expiration.
+
+    Spot and the expiration list are fetched once, concurrently, and every
+    chain is then fetched in parallel (bounded by ASYNC_CONCURRENCY), so the
+    whole surface costs roughly one slow chain fetch. Node extraction runs
+    in a worker thread so the event loop keeps serving. Each per-expiration
+    result is also stored in CACHE so follow-up /nodes calls for the same
+    symbol are served from memory.
+    """
+    spot, expirations = await asyncio.gather(
+        _spot_async(symbol), _expirations_async(symbol)
+    )
+    chains = await _chains_async(symbol, spot, expirations, _expiry_priorities(expirations, expirations))
+
+    per_expiry = await asyncio.to_thread(_nodes_from_chains, symbol, spot, chains)
+    _store_expirations(symbol, expirations, per_expiry)
+
+    return _assemble_surface(symbol, spot, expirations, per_expiry)
+
+
+def _nodes_from_chains(symbol: str, spot: float, chains: Dict[str, Any]) -> Dict[str, Optional[dict]]:
+    # chains values are chains or the Exception raised fetching them
+    per_expiry = {}
+    for exp, options in chains.items():
+        try:
+            if isinstance(options, Exception):
+                raise options
+            per_expiry[exp] = _nodes_from_chain(symbol, spot, exp, options)
+        except Exception as e:
+            print(f"GammaMaps Error [Surface/{symbol}/{exp}]: {str(e)}")
+            per_expiry[exp] = None
+    return per_expiry
+
+
+def _store_expirations(symbol: str, expirations: List[str],
+                       per_expiry: Dict[str, Optional[dict]], ttl: float = None):
+    for exp, data in per_expiry.items():
+        if data is None:
+            continue
+        payload = _payload("nodes", symbol, data)
+        CACHE.set(f"{symbol}_{exp}", payload, ttl=ttl)
+        if expirations and exp == expirations[0]:
+            CACHE.set(f"{symbol}_default", payload, ttl=ttl)
+
+
+def _assemble_surface(symbol: str, spot: float, expirations: List[str],
+                      per_expiry: Dict[str, Optional[dict]]) -> dict:
+    # Union of in-band strikes across expirations, highest first (table order)
+    all_strikes = set()
+    for data in per_expiry.values():
+        if data:
+            all_strikes.update(n["strike"] for n in data["all_nodes"])
+    strikes = sorted(all_strikes, reverse=True)
+    row_of = {s: i for i, s in enumerate(strikes)}
+
+    # gex[i][j] -> strike i, expiration j; None where the expiry has no node
+    gex = [[None] * len(expirations) for _ in strikes]
+    summaries = []
+    for j, exp in enumerate(expirations):
+        data = per_expiry.get(exp)
+        if not data:
+            summaries.append({"expiration": exp, "available": False})
+            continue
+        for n in data["all_nodes"]:
+            gex[row_of[n["strike"]]][j] = n["gex"]
+        summaries.append({
+            "expiration": exp,
+            "available": True,
+            "net_exposure": data["net_exposure"],
+            "environment": data["environment"],
+            "king_node": data["king_node"],
+            "nearest_levels": data["nearest_levels"],
+            "zero_gamma": data["zero_gamma"],
+        })
+
+    return {
+        "symbol": symbol,
+        "spot": round(spot, 2),
+        "timestamp": int(time.time()),
+        "expirations": expirations,
+        "strikes": strikes,
+        "gex": gex,
+        "summaries": summaries,
+    }
+
+
+# --- Multi-symbol batch ---
+def _compute_pool() -> ProcessPoolExecutor:
+    # Created on first use; spawned workers do not inherit the server's threads
+    global _COMPUTE
+    if _COMPUTE is None:
+        _COMPUTE = ProcessPoolExecutor(max_workers=COMPUTE_WORKERS,
+                                       mp_context=multiprocessing.get_context("spawn"))
+    return _COMPUTE
+
+
+async def _profile_async(chain: OptionChain, spot: float):
+    """
+    Run profile_arrays for one chain in the compute pool. Only the chain's
+    contiguous numpy columns cross the process boundary.
+    """
+    args = (chain.strike, chain.is_put, chain.open_interest, chain.gamma, spot,
+            SMOOTH_WINDOW, SMOOTH_KERNEL, SMOOTH_BY)
+    if COMPUTE_WORKERS <= 0:
+        return profile_arrays(*args)
+    return await asyncio.get_running_loop().run_in_executor(_compute_pool(), profile_arrays, *args)
+
+
+async def _batch_symbol(symbol: str, requested: List[str], errors: List[dict]) -> Dict[str, dict]:
+    """
+    Node results for the requested expirations of one symbol (the nearest
+    when none are requested). Fresh cached results are reused; the rest are
+    fetched concurrently; the profile math runs in the pool and repricing,
+    extraction and scenarios in worker threads, so the event loop only
+    schedules. Failures are appended to `errors` instead of raised, except
+    for the spot/expiration lookups.
+    """
+    spot, expirations = await asyncio.gather(
+        _spot_async(symbol), _expirations_async(symbol)
+    )
+    selected = [e for e in requested if e in expirations] if requested else expirations[:1]
+    for exp in requested:
+        if exp not in expirations:
+            errors.append({"symbol": symbol, "expiration": exp, "error": "Unknown expiration"})
+
+    results, missing = {}, []
+    for exp in selected:
+        value, state = CACHE.lookup(f"{symbol}_{exp}")
+        if state == FRESH:
+            results[exp] = value.data
+        else:
+            missing.append(exp)
+
+    chains = await _chains_async(symbol, spot, missing, _expiry_priorities(expirations, missing))
+
+    async def compute(exp, chain):
+        if isinstance(chain, Exception):
+            raise chain
+        chain = await asyncio.to_thread(_priced, symbol, spot, chain)
+        key = _memo_key(chain, spot)
+        # Exposure + smoothing in the pool, including the round trip
+        with stage(symbol, "profile"):
+            hit, profile = MEMO.lookup("profile", key and key + SMOOTH_PARAMS)
+            if not hit:
+                profile = await _profile_async(chain, spot)
+                MEMO.store("profile", key and key + SMOOTH_PARAMS, profile)
+        return chain, key, profile
+
+    computed = await asyncio.gather(*(compute(e, chains[e]) for e in missing),
+                                    return_exceptions=True)
+
+    def extract():
+        # Needs this process's history and stream, so a thread rather than the pool
+        built = {}
+        for exp, outcome in zip(missing, computed):
+            try:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                chain, key, profile = outcome
+                data = _nodes_from_profile(symbol, spot, exp, chain, *profile, key=key)
+                if data is None:
+                    raise RuntimeError(f"No gamma exposure available for {symbol} {exp}")
+                built[exp] = data
+            except Exception as e:
+                print(f"GammaMaps Error [Batch/{symbol}/{exp}]: {str(e)}")
+                errors.append({"symbol": symbol, "expiration": exp, "error": str(e)})
+        return built
+
+    built = await asyncio.to_thread(extract)
+    results.update(built)
+    _store_expirations(symbol, expirations, built)
+
+    return {exp: results[exp] for exp in selected if exp in results}
+
+
+async def build_batch_async(symbols: List[str], expirations: List[str]) -> dict:
+    """
+    Nodes for several symbols in one call. Every symbol is fetched
+    concurrently and the profile math runs in the compute pool, so the
+    batch costs roughly its slowest symbol. A failing symbol or expiration
+    is reported in "errors" without affecting the others.
+    """
+    errors: List[dict] = []
+    outcomes = await asyncio.gather(*(_batch_symbol(s, expirations, errors) for s in symbols),
+                                    return_exceptions=True)
+
+    results = {}
+    for symbol, outcome in zip(symbols, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"GammaMaps Error [Batch/{symbol}]: {str(outcome)}")
+            errors.append({"symbol": symbol, "expiration": None, "error": str(outcome)})
+        else:
+            results[symbol] = outcome
+
+    return {"timestamp": int(time.time()), "results": results, "errors": errors}
+
+
+def _cached(cache_key: str, build: Callable[[], Any], ttl: float = None,
+            serve_stale: bool = True) -> Payload:
+    """
+    Serve cache_key from CACHE, building it on a miss. Built data is
+    encoded once into a Payload and the Payload is what gets cached.
+
+    Fresh entries are returned directly. Stale entries are returned
+    immediately while a single background refresh runs, unless
+    `serve_stale` is off, when they count as misses. Misses build inline;
+    concurrent misses for the same key share one build.
+    """
+    started = time.perf_counter()
+    value, state = CACHE.lookup(cache_key)
+    add_span("cache_lookup", started, time.perf_counter(), key=cache_key, state=state or "miss")
+    if state == FRESH:
+        return value
+
+    def build_and_store():
+        # Another caller may have refreshed the key since our lookup
+        value, state = CACHE.lookup(cache_key, record=False)
+        if state == FRESH:
+            return value
+        value = _payload_for_key(cache_key, build())
+        CACHE.set(cache_key, value, ttl=ttl)
+        return value
+
+    if state == STALE and serve_stale:
+        if _claim_revalidation(cache_key):
+            _REFRESHER.submit(_revalidate, cache_key, build_and_store)
+        return value
+
+    return FLIGHTS.do(cache_key, build_and_store)
+
+
+def _claim_revalidation(cache_key: str) -> bool:
+    """True if the caller should schedule cache_key's revalidation (none is pending)."""
+    with _REVALIDATING_LOCK:
+        if cache_key in _REVALIDATING:
+            return False
+        _REVALIDATING.add(cache_key)
+        return True
+
+
+def _release_revalidation(cache_key: str):
+    with _REVALIDATING_LOCK:
+        _REVALIDATING.discard(cache_key)
+
+
+def _revalidate(cache_key: str, build_and_store: Callable[[], Any]):
+    try:
+        with priority(BACKGROUND):
+            FLIGHTS.do(cache_key, build_and_store)
+    except Exception as e:
+        print(f"GammaMaps Error [Revalidate/{cache_key}]: {str(e)}")
+    finally:
+        _release_revalidation(cache_key)
+
+
+async def _cached_async(cache_key: str, build: Callable[[], Awaitable[Any]],
+                        ttl: float = None, serve_stale: bool = True) -> Payload:
+    """
+    Async counterpart of _cached for coroutine builders.
+    """
+    started = time.perf_counter()
+    value, state = CACHE.lookup(cache_key)
+    add_span("cache_lookup", started, time.perf_counter(), key=cache_key, state=state or "miss")
+    if state == FRESH:
+        return value
+
+    async def build_and_store():
+        value, state = CACHE.lookup(cache_key, record=False)
+        if state == FRESH:
+            return value
+        value = _payload_for_key(cache_key, await build())
+        CACHE.set(cache_key, value, ttl=ttl)
+        return value
+
+    async def revalidate():
+        with priority(BACKGROUND):
+            return await FLIGHTS.do_async(cache_key, build_and_store)
+
+    if state == STALE and serve_stale:
+        if not _claim_revalidation(cache_key):
+            return value
+        task = asyncio.ensure_future(revalidate())
+        _REFRESH_TASKS.add(task)
+        # Released even if the task is cancelled before it starts
+        task.add_done_callback(lambda _: _release_revalidation(cache_key))
+        task.add_done_callback(_revalidated)
+        return value
+
+    return await FLIGHTS.do_async(cache_key, build_and_store)
+
+
+def _revalidated(task: asyncio.Future):
+    _REFRESH_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"GammaMaps Error [Revalidate]: {str(task.exception())}")
+
+
+def get_cached_payload(symbol: str, expiration: str = None) -> Payload:
+    """
+    Returns the cached, pre-encoded nodes payload if fresh, otherwise builds it.
     Cache key includes expiration to cache multiple expirations separately.
     """
     cache_key = f"{symbol.upper()}_{expiration or 'default'}"
-    now = time.time()
-    entry = CACHE.get(cache_key)
+    return _cached(cache_key, lambda: build_nodes(symbol.upper(), expiration), ttl=NODES_TTL_SECONDS,
+                   serve_stale=NODES_SERVE_STALE)
+
+
+def get_cached_or_build(symbol: str, expiration: str = None) -> Dict[str, Any]:
+    """
+    Returns cached data if fresh, otherwise builds new data.
+    """
+    return get_cached_payload(symbol, expiration).data
+
+
+async def get_cached_surface(symbol: str) -> Payload:
+    """
+    Returns the cached surface payload if fresh, otherwise rebuilds it.
+    """
+    cache_key = f"{symbol.upper()}_surface"
+    return await _cached_async(cache_key, lambda: build_surface_async(symbol.upper()),
+                               ttl=NODES_TTL_SECONDS, serve_stale=NODES_SERVE_STALE)
+
+
+async def get_cached_expirations(symbol: str) -> Payload:
+    async def build():
+        return {"symbol": symbol, "expirations": await get_expirations_async(symbol)}
+
+    return await _cached_async(f"{symbol}_expirations", build, ttl=EXPIRATIONS_TTL_SECONDS)
+
+
+def get_cached_scenario(symbol: str, expiration: str = None, width: float = SCENARIO_WIDTH,
+                        step: float = SCENARIO_STEP) -> Payload:
+    symbol = symbol.upper()
+    cache_key = f"{symbol}_scenario_{expiration or 'default'}_{width:g}_{step:g}"
+    return _cached(cache_key, lambda: build_scenario(symbol, expiration, width, step),
+                   ttl=NODES_TTL_SECONDS, serve_stale=NODES_SERVE_STALE)
+
+
+# --- Background pre-warming ---
+# GAMMAMAPS_WATCHLIST="SPX:15,SPY:30" refreshes each symbol's front
+# expirations every N seconds and the remaining (back) expirations every
+# N * BACK_INTERVAL_MULTIPLIER seconds, so /nodes, /surface and
+# /expirations for watched symbols are answered from memory. In tiered mode
+# N is the chain cadence (e.g. "SPX:180") and a spot-only job rebuilds every
+# SPOT_TTL_SECONDS from the held chains.
+def _parse_watchlist(raw: str) -> Dict[str, float]:
+    watchlist = {}
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        symbol, _, interval = item.partition(":")
+        watchlist[symbol.strip().upper()] = float(interval or DEFAULT_REFRESH_SECONDS)
+    return watchlist
+
+
+async def _watched_expirations(symbol: str) -> List[str]:
+    value, _ = CACHE.lookup(f"{symbol}_expirations", record=False)
+    if value is None:
+        return await _refresh_expirations_list(symbol)
+    return value.data["expirations"]
+
+
+async def _refresh_expirations_list(symbol: str) -> List[str]:
+    exps = await get_expirations_async(symbol)
+    payload = _payload("expirations", symbol, {"symbol": symbol, "expirations": exps})
+    # Outlives a jittered tick, as the node jobs' entries do
+    CACHE.set(f"{symbol}_expirations", payload,
+              ttl=max(EXPIRATIONS_TTL_SECONDS, 2 * EXPIRATIONS_REFRESH_SECONDS))
+    return exps
+
+
+async def _refresh_expiries(symbol: str, front: bool, interval: float):
+    expirations = await _watched_expirations(symbol)
+    selected = expirations[:FRONT_EXPIRIES] if front else expirations[FRONT_EXPIRIES:]
+    if not selected:
+        return
+
+    spot = await _spot_async(symbol)
+    # Scheduled pulls always refetch; in tiered mode they also reset CHAINS
+    chains = await get_options_chains_async(symbol, selected)
+    for exp, chain in chains.items():
+        if isinstance(chain, Exception):
+            continue
+        if TIERED:
+            CHAINS.set(f"{symbol}_{exp}", chain)
+        _archive_chain(symbol, spot, chain)
+
+    # Keep entries fresh until the next scheduled refresh lands
+    ttl = max(CACHE_TTL_SECONDS, 2 * interval)
+    await asyncio.to_thread(_rebuild, symbol, spot, expirations, chains, ttl)
+
+
+async def _refresh_spot(symbol: str, interval: float):
+    """
+    Fast tier: fetch spot only and rebuild every expiration whose chain is
+    held in CHAINS, with gamma repriced locally at the new spot.
+    """
+    spot = _store_spot(symbol, await get_spot_async(symbol))
+    expirations = await _watched_expirations(symbol)
+    chains = {}
+    for exp in expirations:
+        chain, _ = CHAINS.lookup(f"{symbol}_{exp}", record=False)
+        if chain is not None:
+            chains[exp] = chain
+    if not chains:
+        return
+    await asyncio.to_thread(_rebuild, symbol, spot, expirations, chains,
+                            max(NODES_TTL_SECONDS, 2 * interval))
+
 
-    if entry and now - entry["timestamp"] < CACHE_TTL_SECONDS:
-        return entry["data"]
+def _rebuild(symbol: str, spot: float, expirations: List[str], chains: Dict[str, Any], ttl: float):
+    # Compute and store in a worker thread, off the event loop
+    _store_refresh(symbol, spot, expirations, _nodes_from_chains(symbol, spot, chains), ttl)
 
-    data = build_nodes(symbol.upper(), expiration)
-    CACHE[cache_key] = {"data": data, "timestamp": now}
-    return data
+
+def _store_refresh(symbol: str, spot: float, expirations: List[str],
+                   per_expiry: Dict[str, Optional[dict]], ttl: float):
+    _store_expirations(symbol, expirations, per_expiry, ttl=ttl)
+
+    # Re-assemble the surface from whatever expirations are now in memory
+    cached = {}
+    for exp in expirations:
+        payload, _ = CACHE.lookup(f"{symbol}_{exp}", record=False)
+        cached[exp] = payload.data if payload is not None else None
+    surface = _assemble_surface(symbol, spot, expirations, cached)
+    CACHE.set(f"{symbol}_surface", _payload("surface", symbol, surface), ttl=ttl)
+
+
+async def _in_background(job: Awaitable[Any]) -> Any:
+    # Pre-warming yields the vendor quota to user requests (spot aside)
+    with priority(BACKGROUND):
+        return await job
+
+
+def _schedule_watchlist():
+    for symbol, interval in WATCHLIST.items():
+        back_interval = interval * BACK_INTERVAL_MULTIPLIER
+        SCHEDULER.add_job(
+            f"{symbol}/expirations", EXPIRATIONS_REFRESH_SECONDS,
+            lambda s=symbol: _in_background(_refresh_expirations_list(s)),
+        )
+        SCHEDULER.add_job(
+            f"{symbol}/front", interval,
+            lambda s=symbol, i=interval: _in_background(_refresh_expiries(s, True, i)),
+        )
+        SCHEDULER.add_job(
+            f"{symbol}/back", back_interval,
+            lambda s=symbol, i=back_interval: _in_background(_refresh_expiries(s, False, i)),
+        )
+        if TIERED:
+            SCHEDULER.add_job(
+                f"{symbol}/spot", SPOT_TTL_SECONDS,
+                lambda s=symbol: _in_background(_refresh_spot(s, SPOT_TTL_SECONDS)),
+            )
+
+
+WATCHLIST = _parse_watchlist(os.environ.get("GAMMAMAPS_WATCHLIST", ""))
+# History rings must hold ROC_LOOKBACK_SECONDS at the fastest build cadence
+HISTORY.capacity = capacity_for(
+    ROC_LOOKBACK_SECONDS, min([NODES_TTL_SECONDS or CACHE_TTL_SECONDS, *WATCHLIST.values()]),
+    HISTORY.capacity,
+)
+SCHEDULER = RefreshScheduler(jitter=0.1)
+_schedule_watchlist()
+
+
+class _RequestTimer:
+    """
+    ASGI middleware recording latency per route template and status, and
+    the request trace when tracing is on. Plain ASGI rather than
+    BaseHTTPMiddleware to keep per-request cost low.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+        trace = None
+        if TRACER.enabled:
+            query = scope.get("query_string", b"").decode("latin-1")
+            trace = TRACER.begin(scope["path"] + ("?" + query if query else ""))
+
+        async def send_and_capture(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_capture)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.observe(time.perf_counter() - start, route, str(status[0]))
+            if trace is not None:
+                TRACER.end(trace, status[0])
+            if _PROFILER is not None:
+                _PROFILER.request_done()
+
+
+app.add_middleware(_RequestTimer)
+
+
+def _collect_metrics():
+    """Scrape-time view of the counters CACHE, FLIGHTS, STREAM, MEMO and the client keep."""
+    cache = CACHE.stats()
+    yield ("gammamaps_cache_lookups_total", "counter", "Response cache lookups by result",
+           [({"result": "hit"}, cache["hits"]), ({"result": "stale"}, cache["stale_hits"]),
+            ({"result": "miss"}, cache["misses"])])
+    yield ("gammamaps_cache_evictions_total", "counter", "Cache entries removed by reason",
+           [({"reason": "capacity"}, cache["evictions"]), ({"reason": "expired"}, cache["expirations"])])
+    yield ("gammamaps_cache_entries", "gauge", "Entries held in the response cache",
+           [({}, cache["entries"])])
+    yield ("gammamaps_cache_bytes", "gauge", "Encoded bytes held in the response cache",
+           [({}, cache["bytes"])])
+
+    flights = FLIGHTS.stats()
+    yield ("gammamaps_single_flight_total", "counter", "Builds executed vs coalesced onto one in flight",
+           [({"outcome": "executed"}, flights["executed"]), ({"outcome": "coalesced"}, flights["coalesced"])])
+
+    stream = STREAM.stats()
+    yield ("gammamaps_stream_subscribers", "gauge", "Open /stream subscriptions",
+           [({"symbol": s}, n) for s, n in stream["subscribers"].items()])
+
+    hosts = get_client().stats()
+    yield ("gammamaps_vendor_connections_total", "counter", "Vendor HTTP connections opened",
+           [({"host": h}, st["connections_opened"]) for h, st in hosts.items()])
+    yield ("gammamaps_vendor_requests_total", "counter", "Vendor HTTP requests sent, retries included",
+           [({"host": h}, st["requests"]) for h, st in hosts.items()])
+
+    memo = MEMO.stats()
+    yield ("gammamaps_memo_lookups_total", "counter", "Memoized stage lookups by stage and result",
+           [({"stage": st, "result": result}, counts[field])
+            for st, counts in memo["stages"].items()
+            for result, field in (("hit", "hits"), ("miss", "misses"))])
+    yield ("gammamaps_memo_entries", "gauge", "Stage outputs held in the memo",
+           [({}, memo["entries"])])
+
+    limiter = LIMITER.stats()
+    yield ("gammamaps_vendor_queue_depth", "gauge", "Vendor calls waiting for a rate-limit token",
+           [({"priority": p}, n) for p, n in limiter["queued"].items()])
+    yield ("gammamaps_vendor_tokens", "gauge", "Rate-limit tokens currently available",
+           [({}, limiter["tokens"])])
+
+    if ARCHIVE is not None:
+        archive = ARCHIVE.stats()
+        yield ("gammamaps_archive_rows_written_total", "counter", "Rows written to the Parquet archive",
+               [({}, archive["rows_written"])])
+        yield ("gammamaps_archive_dropped_total", "counter", "Snapshots dropped on a full archive queue",
+               [({}, archive["dropped"])])
+
+
+REGISTRY.register(_collect_metrics)
+
+
+def _respond(request: Request, payload: Payload) -> Response:
+    """
+    Send a cached payload's pre-encoded bytes, answering a matching
+    If-None-Match with 304 and gzipping large bodies when accepted.
+    """
+    gzipped = len(payload) >= GZIP_MIN_BYTES and "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": payload.gzip_etag if gzipped else payload.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if payload.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+
+    body = payload.body
+    if gzipped:
+        body = payload.gzipped
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.get("/nodes")
-def get_nodes(symbol: str = "SPX", expiration: Optional[str] = None):
+def get_nodes(request: Request, symbol: str = "SPX", expiration: Optional[str] = None):
     """
     Get GEX nodes for a symbol and expiration.
 
@@ -73,15 +1024,59 @@ def get_nodes(symbol: str = "SPX", expiration: Optional[str] = None):
         expiration: Optional expiration date in YYYY-MM-DD format
     """
     try:
-        data = get_cached_or_build(symbol, expiration)
-        return JSONResponse(content=data)
+        return _respond(request, get_cached_payload(symbol, expiration))
     except Exception as e:
         print(f"GammaMaps Error [{symbol}]: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/nodes/batch")
+async def get_nodes_batch(request: Request, symbols: str = "SPX", expirations: Optional[str] = None):
+    """
+    Get GEX nodes for several symbols in one call.
+
+    Args:
+        symbols: Comma-separated tickers (SPX,SPY,QQQ,...)
+        expirations: Optional comma-separated expirations (YYYY-MM-DD) to
+            build for every symbol that lists them; defaults to each
+            symbol's nearest expiration
+
+    Returns:
+        {"timestamp", "results": {symbol: {expiration: nodes}},
+         "errors": [{"symbol", "expiration", "error"}]}
+    """
+    symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    exp_list = [e.strip() for e in (expirations or "").split(",") if e.strip()]
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols requested")
+    if len(symbol_list) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {MAX_BATCH_SYMBOLS} symbols per batch")
+
+    return _respond(request, _payload("batch", "*", await build_batch_async(symbol_list, exp_list)))
+
+
+@app.get("/surface")
+async def get_surface(request: Request, symbol: str = "SPX"):
+    """
+    Get the full strike x expiration GEX surface for a symbol in one call.
+
+    Args:
+        symbol: Ticker symbol (SPX, SPY, QQQ, etc.)
+
+    Returns:
+        {"symbol", "spot", "timestamp", "expirations": [...], "strikes": [...],
+         "gex": [[...]] (strike rows x expiration columns), "summaries": [...]}
+    """
+    try:
+        return _respond(request, await get_cached_surface(symbol))
+    except Exception as e:
+        print(f"GammaMaps Error [Surface/{symbol}]: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/expirations")
-def get_expirations_list(symbol: str = "SPX"):
+async def get_expirations_list(request: Request, symbol: str = "SPX"):
     """
     Returns list of available expirations for a symbol.
 
@@ -92,8 +1087,203 @@ def get_expirations_list(symbol: str = "SPX"):
         {"symbol": "SPX", "expirations": ["2025-11-25", "2025-11-26", ...]}
     """
     try:
-        exps = get_expirations(symbol)
-        return {"symbol": symbol.upper(), "expirations": exps}
+        return _respond(request, await get_cached_expirations(symbol.upper()))
     except Exception as e:
         print(f"GammaMaps Error [Expirations/{symbol}]: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _sse(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+@app.get("/stream")
+async def stream_nodes(request: Request, symbol: str = "SPX"):
+    """
+    Server-sent event stream of node updates for a symbol.
+
+    Sends a "snapshot" event with every expiration currently in memory,
+    then "delta" events whenever the service rebuilds an expiration:
+    only nodes that changed, strikes that left the band, and changed
+    summary fields (spot, net_exposure, environment, king_node,
+    nearest_levels). Slow clients skip intermediate updates and receive
+    one delta against what they last saw.
+    """
+    symbol = symbol.upper()
+    sub = STREAM.subscribe(symbol)
+
+    async def events():
+        try:
+            yield _sse("snapshot", sub.snapshot())
+            while not await request.is_disconnected():
+                if not await sub.wait(STREAM_KEEPALIVE_SECONDS):
+                    yield b": keepalive\n\n"
+                    continue
+                for message in sub.deltas():
+                    yield _sse(message["type"], message)
+        finally:
+            STREAM.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/scenario")
+def get_scenario(request: Request, symbol: str = "SPX", expiration: Optional[str] = None,
+                 width: float = SCENARIO_WIDTH, step: float = SCENARIO_STEP):
+    """
+    Total GEX under hypothetical spot moves and the zero-gamma level.
+
+    Args:
+        symbol: Ticker symbol
+        expiration: Optional expiration date (YYYY-MM-DD); defaults to the nearest
+        width: Largest relative spot move (0.10 = +/- 10%)
+        step: Grid spacing as a fraction of spot (0.001 = 0.1%)
+
+    Returns:
+        {"symbol", "spot", "expiration", "timestamp", "width", "step",
+         "spots": [...], "gex": [...], "zero_gamma", "flips": [...]}
+    """
+    if not (0 < width < 1) or step <= 0 or 2 * width / step + 1 > MAX_SCENARIO_POINTS:
+        raise HTTPException(status_code=400,
+                            detail=f"Need 0 < width < 1 and at most {MAX_SCENARIO_POINTS} grid points")
+    try:
+        return _respond(request, get_cached_scenario(symbol, expiration, width, step))
+    except Exception as e:
+        print(f"GammaMaps Error [Scenario/{symbol}]: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/history")
+def get_history(
+    symbol: str = "SPX",
+    expiration: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    max_points: int = 200,
+    strike_min: Optional[float] = None,
+    strike_max: Optional[float] = None,
+):
+    """
+    Returns a downsampled GEX-per-strike time series for a symbol/expiration.
+
+    Args:
+        symbol: Ticker symbol
+        expiration: Expiration date (YYYY-MM-DD); defaults to the nearest
+        start, end: Optional unix-time bounds
+        max_points: Maximum number of snapshots returned
+        strike_min, strike_max: Optional strike band
+
+    Returns:
+        {"symbol", "expiration", "strikes": [...], "timestamps": [...],
+         "gex": [[...]] (one row per timestamp, null where a strike was absent)}
+    """
+    symbol = symbol.upper()
+    if expiration is None:
+        payload, _ = CACHE.lookup(f"{symbol}_default", record=False)
+        if payload is None:
+            raise HTTPException(status_code=404, detail=f"No history for {symbol}")
+        expiration = payload.data["expiration"]
+
+    series = HISTORY.series(symbol, expiration, start=start, end=end, max_points=max_points,
+                            strike_min=strike_min, strike_max=strike_max)
+    if series is None:
+        raise HTTPException(status_code=404, detail=f"No history for {symbol} {expiration}")
+    return series
+
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus text-format metrics: per-stage build latency by symbol,
+    vendor status codes and response sizes, payload sizes, request latency
+    by route, and cache / coalescing / stream counters.
+    """
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def _require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@app.get("/admin/traces")
+def get_traces(request: Request, limit: int = 20):
+    """
+    Slowest recent requests with their spans (cache lookup, vendor calls,
+    compute stages, encoding). Requires the X-Admin-Token header.
+    """
+    _require_admin(request)
+    return {"enabled": TRACER.enabled, "traced": TRACER.traced, "traces": TRACER.slowest(limit)}
+
+
+@app.post("/admin/tracing")
+def set_tracing(request: Request, enabled: bool):
+    """Turn request tracing on or off. Requires the X-Admin-Token header."""
+    _require_admin(request)
+    TRACER.enabled = enabled
+    if not enabled:
+        TRACER.clear()
+    return {"enabled": TRACER.enabled}
+
+
+@app.post("/admin/profile")
+async def run_profile(request: Request, seconds: Optional[float] = None,
+                      requests: Optional[int] = None, interval_ms: float = PROFILE_INTERVAL * 1e3):
+    """
+    Sample every thread's stack for `seconds`, or until `requests` more
+    requests have completed (capped at PROFILE_MAX_SECONDS), and return
+    the stacks in collapsed format for flamegraph.pl / speedscope.
+    Requires the X-Admin-Token header.
+    """
+    global _PROFILER
+    _require_admin(request)
+    if (seconds is None) == (requests is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of seconds or requests")
+    if _PROFILER is not None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    profiler = SamplingProfiler(interval=max(interval_ms, 1.0) / 1e3)
+    _PROFILER = profiler
+    try:
+        profiler.start(requests=requests)
+        timeout = min(seconds if seconds is not None else PROFILE_MAX_SECONDS, PROFILE_MAX_SECONDS)
+        await asyncio.to_thread(profiler.wait, timeout)
+    finally:
+        _PROFILER = None
+        profiler.stop()
+
+    headers = {
+        "X-Profile-Samples": str(profiler.samples),
+        "X-Profile-Requests": str(profiler.requests),
+        "X-Profile-Seconds": f"{profiler.finished - profiler.started:.3f}",
+    }
+    return Response(content=profiler.folded(), media_type="text/plain", headers=headers)
+
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """
+    Returns cache, request-coalescing and stage memoization counters.
+    """
+    stats = {"cache": CACHE.stats(), "single_flight": FLIGHTS.stats(), "stream": STREAM.stats(),
+             "memo": MEMO.stats()}
+    if ARCHIVE is not None:
+        stats["archive"] = ARCHIVE.stats()
+    return stats
+
+
+@app.get("/scheduler/status")
+def get_scheduler_status():
+    """
+    Returns the pre-warming watch-list, per-job refresh status (last
+    start/finish time, duration, runs, skipped ticks, last error) and the
+    vendor rate limiter's tokens, queue depths and shed counts.
+    """
+    return {"watchlist": WATCHLIST, "jobs": SCHEDULER.status(), "vendor_limiter": LIMITER.stats()}
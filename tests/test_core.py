@@ -0,0 +1,925 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+import core.data as data
+from benchmarks.bench_pipeline import compare
+from benchmarks.fake_tradier import FakeTradier, Fixtures
+from benchmarks.synthetic import synthetic_options
+from core.archive import SnapshotArchive, read_snapshots
+from core.cache import FRESH, STALE, SingleFlight, TTLCache
+from core.calc import compute_exposure, smooth_array, smooth_profile
+from core.chain import OptionChain
+from core.client import VendorClient
+from core.greeks import bs_gamma, expiry_timestamp, local_gamma, years_to_expiry
+from core.history import HistoryStore, capacity_for
+from core.memo import StageMemo
+from core.metrics import Registry
+from core.nodes import extract_nodes
+from core.payload import Payload
+from core.profiler import SamplingProfiler
+from core.ratelimit import BACK, BACKGROUND, SPOT, RateLimited, RateLimiter, priority
+from core.replay import replay
+from core.scenario import ScenarioEngine
+from core.scheduler import RefreshScheduler
+from core.stream import NodeStream, diff_nodes
+from core.trace import Tracer, span
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures_left = 0
+
+    def do_GET(self):
+        if _StandIn.failures_left > 0:
+            _StandIn.failures_left -= 1
+            self._send(503, {"fault": "unavailable"})
+        else:
+            self._send(200, {"quotes": {"quote": {"last": 6000.0}}})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    """The service wired to a fake Tradier (recorded bodies under tmp_path win)."""
+    import gammamaps_service as svc
+
+    fake = FakeTradier(Fixtures(directory=str(tmp_path), expirations=4, contracts=400)).start()
+    monkeypatch.setattr(data, "TRADIER_BASE", fake.base_url)
+    monkeypatch.setattr(data, "TRADIER_TOKEN", "test")
+    monkeypatch.setattr(data, "LIMITER", RateLimiter(rate=0, burst=1))
+    monkeypatch.setattr(svc, "COMPUTE_WORKERS", 0)
+    try:
+        yield svc, TestClient(svc.app), fake
+    finally:
+        fake.stop()
+
+
+def _record_chain(tmp_path, symbol: str, expiration: str, body: bytes):
+    (tmp_path / "chains").mkdir(exist_ok=True)
+    (tmp_path / "chains" / f"{symbol}_{expiration}.json").write_bytes(body)
+
+
+def test_vendor_client_reuses_connections_and_retries():
+    server, base = _serve()
+    client = VendorClient(pool_size=2, max_retries=3, backoff_factor=0)
+    try:
+        _StandIn.failures_left = 2
+        resp = client.get(f"{base}/markets/quotes")
+        assert resp.status_code == 200
+        for _ in range(4):
+            assert client.get(f"{base}/markets/quotes").status_code == 200
+
+        stats = client.stats()[f"127.0.0.1:{server.server_address[1]}"]
+        assert stats["requests"] == 7  # 2 retried 503s + 5 successes
+        assert stats["connections_opened"] == 1
+        assert stats["connections_reused"] == 6
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_single_flight_coalesces_and_shares_errors():
+    flights = SingleFlight()
+    calls = []
+    start = threading.Barrier(5)
+
+    def build():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("vendor down")
+
+    errors = []
+
+    def caller():
+        start.wait()
+        try:
+            flights.do("SPX_default", build)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(errors) == 5
+    assert flights.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+    # The failure is not remembered: the next call builds again
+    assert flights.do("SPX_default", lambda: 42) == 42
+
+
+def test_ttl_cache_lru_budget_and_stale_window():
+    cache = TTLCache(max_entries=2, max_bytes=100, ttl=0.05, stale_ttl=0.1, sizeof=len)
+    cache.set("a", "x" * 10)
+    cache.set("b", "x" * 10)
+    cache.lookup("a")
+    cache.set("c", "x" * 10)  # evicts least recently used "b"
+    assert "b" not in cache and "a" in cache
+
+    cache.set("big", "x" * 95)  # byte budget pushes out "a" and "c"
+    assert len(cache) == 1
+
+    assert cache.lookup("big")[1] == FRESH
+    time.sleep(0.07)
+    assert cache.lookup("big")[1] == STALE
+    time.sleep(0.1)
+    assert cache.lookup("big") == (None, None)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (2, 1, 1)
+    assert stats["evictions"] == 3
+
+
+def test_compute_exposure_groups_by_strike_and_skips_bad_rows():
+    spot = 100.0
+    options = [
+        {"strike": 100, "option_type": "call", "open_interest": 10, "greeks": {"gamma": 0.02}},
+        {"strike": "100", "option_type": "put", "open_interest": "4", "greeks": {"gamma": 0.05}},
+        {"strike": 105, "option_type": "call", "open_interest": 0, "greeks": {"gamma": 0.01}},
+        {"strike": 95, "option_type": "put", "open_interest": 7, "greeks": None},
+        {"strike": "n/a", "option_type": "call"},
+        {"strike": 90, "option_type": "put", "open_interest": 2, "greeks": {"gamma": 0.01}},
+    ]
+
+    def gex(gamma, oi):
+        return gamma * oi * 100.0 * (spot ** 2) * 0.01
+
+    assert compute_exposure(options, spot) == {
+        90.0: -gex(0.01, 2),
+        100.0: gex(0.02, 10) - gex(0.05, 4),
+    }
+
+
+def test_option_chain_from_json_matches_dict_path():
+    options = [
+        {"strike": 100, "option_type": "call", "open_interest": 10, "bid": 1.1, "ask": 1.3,
+         "greeks": {"gamma": 0.02, "mid_iv": 0.18}},
+        {"strike": 100, "option_type": "put", "open_interest": 4, "greeks": None},
+        {"strike": 95, "option_type": "put", "open_interest": 7, "greeks": {"gamma": 0.05}},
+        {"strike": None, "option_type": "put"},
+    ]
+    chain = OptionChain.from_json(json.dumps({"options": {"option": options}}), "2026-10-16")
+
+    assert len(chain) == 3
+    assert chain.expiration == "2026-10-16"
+    assert chain.is_put.tolist() == [False, True, True]
+    assert chain.iv[0] == 0.18 and chain.iv[1] != chain.iv[1]  # NaN when missing
+    assert compute_exposure(chain, 100.0) == compute_exposure(options, 100.0)
+
+    assert len(OptionChain.from_json(b'{"options": null}')) == 0
+
+
+def test_smooth_profile_default_is_three_strike_moving_average():
+    profile = {100.0: 3.0, 105.0: 6.0, 110.0: 0.0, 125.0: 9.0}
+    assert smooth_profile(profile) == {100.0: 4.5, 105.0: 3.0, 110.0: 5.0, 125.0: 4.5}
+
+
+def test_smooth_profile_window_wider_than_profile():
+    # Every strike averages the whole profile once the window covers it
+    assert smooth_profile({100.0: 0.0, 105.0: 1.0}, window=3) == {100.0: 0.5, 105.0: 0.5}
+    for n, window in ((3, 5), (4, 6), (5, 16), (1, 2)):
+        values = np.arange(n, dtype=np.float64)
+        smoothed = smooth_array(np.arange(n) * 5.0, values, window=window)
+        assert np.allclose(smoothed, values.mean())
+
+
+def test_smooth_array_price_window_and_kernels():
+    strikes = np.array([100.0, 105.0, 110.0, 125.0, 150.0])
+    values = np.array([4.0, 0.0, 8.0, 2.0, 6.0])
+
+    # Within 10 points of 110: 100, 105, 110 (not 125)
+    assert smooth_array(strikes, values, window=10.0, by="price")[2] == 4.0
+    # Triangular: weights 1, 0.5 at distance 5 and 0 at distance 10
+    tri = smooth_array(strikes, values, window=10.0, kernel="triangular", by="price")
+    assert np.isclose(tri[2], (8.0 + 0.5 * 0.0) / 1.5)
+    # Every kernel is normalised, so a flat profile stays flat
+    flat = np.full(5, 7.0)
+    for kernel in ("box", "triangular", "gaussian"):
+        for by, window in (("index", 3), ("price", 30.0)):
+            assert np.allclose(smooth_array(strikes, flat, window, kernel, by), 7.0)
+
+
+def test_extract_nodes_levels_and_rate_of_change():
+    profile = {90.0: -2e6, 95.0: -8e6, 100.0: 1e6, 105.0: 5e6, 110.0: 10e6, 120.0: 3e6}
+    first = extract_nodes(profile, 101.0, symbol="TEST_ROC")
+
+    assert first["king_node"] == 110.0
+    # 90 and 120 fall outside the +/-10% band around spot
+    assert [n["strike"] for n in first["all_nodes"]] == [110.0, 105.0, 100.0, 95.0]
+    assert [n["strike"] for n in first["strong_nodes"]] == [110.0, 95.0, 105.0, 100.0]
+    assert first["nearest_levels"] == {"support": 95.0, "resistance": 105.0}
+    assert next(n for n in first["all_nodes"] if n["strike"] == 105.0)["is_gatekeeper"]
+    assert all(n["roc"] == "neutral" for n in first["all_nodes"])
+
+    second = extract_nodes({**profile, 105.0: 9e6}, 101.0, symbol="TEST_ROC")
+    node = next(n for n in second["all_nodes"] if n["strike"] == 105.0)
+    assert node["gex_change"] == 4000000 and node["roc"] == "accumulation"
+
+
+def test_history_store_lookback_and_downsampled_series():
+    store = HistoryStore(capacity=4)
+    strikes = np.array([100.0, 105.0])
+    for minute in range(6):  # ring keeps only minutes 2..5
+        store.record("SPX", "2026-10-16", strikes, np.array([minute, -minute], dtype=float),
+                     now=minute * 60.0)
+
+    now = 5 * 60.0
+    assert store.reference("SPX", "2026-10-16", strikes, lookback=0, now=now).tolist() == [5.0, -5.0]
+    assert store.reference("SPX", "2026-10-16", strikes, lookback=120, now=now).tolist() == [3.0, -3.0]
+    # Older than the buffer: fall back to the oldest snapshot held
+    assert store.reference("SPX", "2026-10-16", strikes, lookback=900, now=now).tolist() == [2.0, -2.0]
+    # Other expirations keep separate state; new strikes have no history
+    assert np.isnan(store.reference("SPX", "2026-10-17", strikes, now=now)).all()
+    assert np.isnan(store.reference("SPX", "2026-10-16", np.array([110.0]), now=now)).all()
+
+    series = store.series("SPX", "2026-10-16", max_points=2, strike_min=101.0)
+    assert series["strikes"] == [105.0]
+    assert series["timestamps"] == [180.0, 300.0]
+    assert series["gex"] == [[-3.0], [-5.0]]
+
+
+def test_history_store_save_load_round_trip_at_exact_path(tmp_path):
+    store = HistoryStore(capacity=4)
+    strikes = np.array([100.0, 105.0])
+    for minute in range(3):
+        store.record("SPX", "2026-10-16", strikes, np.array([minute, -minute], dtype=float),
+                     now=minute * 60.0)
+    path = str(tmp_path / "history")  # no .npz suffix
+    store.save(path)
+    assert os.listdir(tmp_path) == ["history"]
+
+    restored = HistoryStore(capacity=4)
+    restored.load(path)
+    assert restored.series("SPX", "2026-10-16") == store.series("SPX", "2026-10-16")
+    # A 15 min lookback at a 1 s cadence needs a bigger ring than the default
+    assert capacity_for(900, 1.0, minimum=512) == 902
+    assert capacity_for(0, 1.0, minimum=512) == 512
+
+
+def test_diff_nodes_sends_only_changed_strikes_and_summary():
+    node = {"strike": 100.0, "gex": 5, "roc": "neutral"}
+    prev = {"spot": 100.0, "king_node": 100.0, "timestamp": 1,
+            "all_nodes": [node, {"strike": 95.0, "gex": 1, "roc": "neutral"}]}
+    cur = {"spot": 101.0, "king_node": 100.0, "timestamp": 2,
+           "all_nodes": [dict(node), {"strike": 105.0, "gex": 2, "roc": "neutral"}]}
+
+    assert diff_nodes(prev, cur) == {
+        "changed": [{"strike": 105.0, "gex": 2, "roc": "neutral"}],
+        "removed": [95.0],
+        "summary": {"spot": 101.0, "timestamp": 2},
+    }
+    assert diff_nodes(prev, {**prev, "timestamp": 3}) is None
+
+
+def test_node_stream_bounds_latest_and_counts_publishes_on_the_loop():
+    stream = NodeStream(ttl=0.05, max_symbols=2)
+    for symbol in ("A", "B", "C"):
+        stream.publish(symbol, "2026-10-16", {"symbol": symbol})
+    assert stream.stats()["symbols"] == 2 and stream.latest("A") == {}
+    time.sleep(0.06)
+    assert stream.latest("C") == {} and stream.stats()["symbols"] == 1
+
+    async def run():
+        sub = stream.subscribe("D")
+        sub.snapshot()
+        threads = [threading.Thread(target=stream.publish, args=("D", f"E{i}", {"i": i}))
+                   for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert await sub.wait(1.0)
+        await asyncio.sleep(0)
+        assert len(sub.deltas()) == 8 and sub.dropped == 7
+
+    asyncio.run(run())
+
+
+def test_snapshot_archive_round_trip_with_filters(tmp_path):
+    archive = SnapshotArchive(str(tmp_path), flush_interval=60)
+    archive.start()
+    strikes = np.array([95.0, 100.0, 105.0])
+    for i, ts in enumerate([1_760_000_000.0, 1_760_000_060.0]):
+        archive.add_profile("SPX", "2026-10-16", 100.0 + i, strikes, strikes * i, strikes * i / 2, ts=ts)
+    archive.add_profile("QQQ", "2026-10-16", 500.0, strikes, strikes, strikes, ts=1_760_000_000.0)
+    archive.stop()
+
+    assert archive.stats()["rows_written"] == 9
+    table = read_snapshots(str(tmp_path), "profiles", "SPX", start=1_760_000_030.0,
+                           strike_min=100.0, columns=["ts", "spot", "strike", "gex"])
+    assert table.column("strike").to_pylist() == [100.0, 105.0]
+    assert table.column("spot").to_pylist() == [101.0, 101.0]
+    assert read_snapshots(str(tmp_path), "chains", "SPX").num_rows == 0
+
+
+def test_replay_carries_roc_per_expiration_within_a_day(tmp_path):
+    archive = SnapshotArchive(str(tmp_path / "archive"))
+    archive.start()
+    for i, ts in enumerate([1_760_000_000.0, 1_760_000_060.0]):
+        for exp in ("2026-10-16", "2026-10-17"):
+            archive.add_chain("SPX", 100.0, OptionChain.from_options([
+                {"strike": 100.0, "option_type": "call", "open_interest": 10 + 90 * i,
+                 "greeks": {"gamma": 0.1}},
+                {"strike": 105.0, "option_type": "put", "open_interest": 50,
+                 "greeks": {"gamma": 0.1}},
+            ], expiration=exp), ts=ts)
+    archive.stop()
+
+    stats = replay(str(tmp_path / "archive"), str(tmp_path / "out"), workers=0)
+    assert stats["errors"] == [] and stats["snapshots"] == 4
+
+    rows = pq.read_table(tmp_path / "out" / "symbol=SPX" / "date=2025-10-09" / "replay.parquet").to_pylist()
+    # First snapshot of each expiration has no history; the second sees the OI build
+    assert [(r["expiration"], r["accumulation"] > 0) for r in rows] == [
+        ("2026-10-16", False), ("2026-10-17", False), ("2026-10-16", True), ("2026-10-17", True),
+    ]
+
+
+def test_synthetic_chains_are_seeded_and_benchmarks_compare():
+    assert len(synthetic_options(1_000)) == 1_000
+    assert synthetic_options(100, seed=7) == synthetic_options(100, seed=7)
+    assert synthetic_options(100, seed=7) != synthetic_options(100, seed=8)
+
+    base = {"results": {"extract_nodes/100": {"median_s": 1.0, "peak_bytes": 100}}}
+    cur = {"results": {"extract_nodes/100": {"median_s": 1.05, "peak_bytes": 150},
+                       "extract_nodes/1000": {"median_s": 9.0, "peak_bytes": 900}}}
+    flagged = [(r["metric"], r["regression"]) for r in compare(base, cur, threshold=0.10)]
+    assert flagged == [("median_s", False), ("peak_bytes", True)]
+
+
+def test_fake_tradier_serves_the_data_layer_and_rate_limits(monkeypatch):
+    fake = FakeTradier(Fixtures(expirations=3, contracts=200), rate_limit=0.01, burst=3).start()
+    try:
+        monkeypatch.setattr(data, "TRADIER_BASE", fake.base_url)
+        monkeypatch.setattr(data, "TRADIER_TOKEN", "test")
+
+        assert data.get_spot("SPY") > 0
+        expirations = data.get_expirations("SPY")
+        assert len(expirations) == 3
+        assert len(data.get_options_chain("SPY", expirations[0])) == 200
+
+        resp = requests.get(f"{fake.base_url}/markets/quotes", params={"symbols": "SPY"})
+        assert resp.status_code == 429 and resp.headers["Retry-After"] == "1"
+        assert fake.stats()["endpoints"]["quotes"] == {"200": 1, "429": 1}
+        assert data.VENDOR_RESPONSES._series[("chains", "200")] == [1.0]
+
+        # Non-200 chain / expiration responses raise instead of parsing the error body
+        monkeypatch.setattr(data, "get_client", lambda: VendorClient(max_retries=0))
+        with pytest.raises(RuntimeError, match="Tradier API Error"):
+            data.get_expirations("SPY")
+        with pytest.raises(RuntimeError, match="Tradier API Error"):
+            data.get_options_chain("SPY", expirations[0])
+    finally:
+        fake.stop()
+
+
+def test_metrics_render_prometheus_text():
+    registry = Registry()
+    hist = registry.histogram("stage_seconds", "Stage latency", ("symbol", "stage"), buckets=(0.1, 1.0))
+    counter = registry.counter("responses_total", "Responses", ("status",))
+    hist.observe(0.05, "SPX", "smooth")
+    hist.observe(0.5, "SPX", "smooth")
+    counter.inc("200", amount=2)
+    registry.register(lambda: [("entries", "gauge", "Cache entries", [({}, 3)])])
+
+    lines = registry.render().splitlines()
+    assert 'stage_seconds_bucket{symbol="SPX",stage="smooth",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{symbol="SPX",stage="smooth",le="+Inf"} 2' in lines
+    assert 'stage_seconds_count{symbol="SPX",stage="smooth"} 2' in lines
+    assert 'responses_total{status="200"} 2.0' in lines
+    assert "# TYPE entries gauge" in lines and "entries 3" in lines
+
+
+def test_tracer_keeps_slowest_requests_with_spans():
+    tracer = Tracer(enabled=True, keep=2)
+    for delay in (0.0, 0.03, 0.01, 0.02):
+        handle = tracer.begin(f"/nodes?d={delay}")
+        with span("vendor", endpoint="chains"):
+            time.sleep(delay)
+        tracer.end(handle, 200)
+
+    slowest = tracer.slowest()
+    assert [t["name"] for t in slowest] == ["/nodes?d=0.03", "/nodes?d=0.02"]
+    assert slowest[0]["spans"][0]["name"] == "vendor"
+    assert slowest[0]["spans"][0]["endpoint"] == "chains"
+
+    # Outside a traced request spans are no-ops
+    tracer.enabled = False
+    assert tracer.begin("/nodes") is None
+    with span("vendor"):
+        pass
+
+
+def test_sampling_profiler_folds_stacks_and_stops_after_requests():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_worker, name="busy")
+    worker.start()
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start(requests=2)
+    time.sleep(0.05)
+    profiler.request_done()
+    profiler.request_done()
+    assert profiler.wait(timeout=5)
+    stop.set()
+    worker.join()
+
+    lines = profiler.folded().splitlines()
+    assert profiler.samples > 0
+    assert any(line.startswith("busy;") and "busy_worker" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_local_gamma_reprices_from_iv_and_keeps_vendor_gamma_without_it():
+    # ATM, 20% vol, 1y, no carry: gamma = phi(0.1) / (S * 0.2)
+    expected = np.exp(-0.5 * 0.1 ** 2) / np.sqrt(2 * np.pi) / (100.0 * 0.2)
+    assert bs_gamma(100.0, np.array([100.0]), np.array([0.2]), 1.0, rate=0.0)[0] == pytest.approx(expected)
+
+    chain = OptionChain.from_options([
+        {"strike": 100.0, "option_type": "call", "open_interest": 1, "greeks": {"gamma": 0.5, "mid_iv": 0.2}},
+        {"strike": 100.0, "option_type": "put", "open_interest": 1, "greeks": {"gamma": 0.5}},
+    ], expiration="2026-10-16")
+    now = 1_760_000_000.0
+    gamma = local_gamma(chain, 100.0, now=now)
+    t = years_to_expiry("2026-10-16", now)
+    assert gamma[0] == pytest.approx(bs_gamma(100.0, chain.strike[:1], chain.iv[:1], t)[0])
+    assert gamma[1] == 0.5
+    # Repricing shares every other column
+    assert chain.with_gamma(gamma).strike is chain.strike
+
+    # Expirations that are not dates fail the same way in both repricing paths
+    odd = OptionChain.from_options([
+        {"strike": 100.0, "option_type": "call", "open_interest": 1, "greeks": {"gamma": 0.5, "mid_iv": 0.2}},
+    ], expiration="E000")
+    with pytest.raises(ValueError):
+        local_gamma(odd, 100.0, now=now)
+    with pytest.raises(ValueError):
+        ScenarioEngine().run(odd, 100.0, now=now)
+
+
+def test_scenario_curve_matches_repriced_exposure_and_finds_zero_gamma():
+    # Short puts below spot, long calls above: gamma flips between them
+    chain = OptionChain.from_options([
+        {"strike": 95.0, "option_type": "put", "open_interest": 100, "greeks": {"gamma": 0.05, "mid_iv": 0.2}},
+        {"strike": 105.0, "option_type": "call", "open_interest": 100, "greeks": {"gamma": 0.05, "mid_iv": 0.2}},
+    ], expiration="2026-10-16")
+    now = 1_760_000_000.0
+    engine = ScenarioEngine(rate=0.0)
+    result = engine.run(chain, 100.0, width=0.10, step=0.001, now=now)
+
+    assert len(result["spots"]) == 201
+    spot = result["spots"][150]    # +5%
+    t = years_to_expiry("2026-10-16", now)
+    gamma = bs_gamma(spot, chain.strike, chain.iv, t, rate=0.0)
+    expected = sum(compute_exposure(chain.with_gamma(gamma), spot).values())
+    assert result["gex"][150] == pytest.approx(expected)
+
+    # Symmetric book: the flip sits between the strikes, below 100 (lognormal
+    # skew), and the interpolated level is a root of the exact curve
+    assert result["flips"] == [result["zero_gamma"]]
+    assert 95.0 < result["zero_gamma"] < 100.0
+    flip = result["zero_gamma"]
+    gamma = bs_gamma(flip, chain.strike, chain.iv, t, rate=0.0)
+    at_flip = sum(compute_exposure(chain.with_gamma(gamma), flip).values())
+    assert abs(at_flip) < 1e-3 * max(abs(g) for g in result["gex"])
+    # Scratch space is reused across calls of the same shape
+    buf = engine._local.buf
+    engine.run(chain, 101.0, now=now)
+    assert engine._local.buf is buf
+
+    # Blocking over contracts caps the scratch buffer without changing the curve
+    chain = OptionChain.from_options(synthetic_options(2_000, spot=100.0), expiration="2026-10-16")
+    whole = ScenarioEngine(rate=0.0, block_elements=10**9).run(chain, 100.0, now=now)["gex"]
+    blocked = ScenarioEngine(rate=0.0, block_elements=1_000)
+    assert blocked.run(chain, 100.0, now=now)["gex"] == pytest.approx(whole)
+    assert blocked._local.buf.size <= 1_000
+
+
+def test_rate_limiter_releases_by_priority_and_sheds_the_lowest():
+    limiter = RateLimiter(rate=10.0, burst=1, max_queue=2, max_wait=5.0)
+    assert limiter.acquire(BACK) == 0.0    # the one burst token
+
+    order, errors = [], []
+
+    def call(level):
+        try:
+            limiter.acquire(level)
+            order.append(level)
+        except RateLimited as e:
+            errors.append((level, str(e)))
+
+    threads = []
+    for level in (BACKGROUND, BACK, SPOT):    # the queue fills before spot arrives
+        threads.append(threading.Thread(target=call, args=(level,)))
+        threads[-1].start()
+        time.sleep(0.01)
+    for t in threads:
+        t.join()
+
+    assert order == [SPOT, BACK]
+    assert errors == [(BACKGROUND, "Vendor rate limit: background call shed")]
+    stats = limiter.stats()
+    assert stats["shed"]["background"] == 1 and stats["granted"]["spot"] == 1
+    assert sum(stats["queued"].values()) == 0
+
+
+def test_extract_memo_follows_history_between_alternating_chains():
+    import gammamaps_service as svc
+
+    exp = "2026-10-16"
+    a = OptionChain.from_options(synthetic_options(400, spot=100.0, seed=1), expiration=exp)
+    b = OptionChain.from_options(synthetic_options(400, spot=100.0, seed=2), expiration=exp)
+    first = svc._nodes_from_chain("MEMOABA", 100.0, exp, a)
+    # An immediate repeat reuses the nodes without recording a snapshot
+    assert svc._nodes_from_chain("MEMOABA", 100.0, exp, a)["all_nodes"] == first["all_nodes"]
+    svc._nodes_from_chain("MEMOABA", 100.0, exp, b)
+    # A after B is compared against B, not served from A's first build
+    back = svc._nodes_from_chain("MEMOABA", 100.0, exp, a)
+    assert back["all_nodes"] != first["all_nodes"]
+    assert any(n["gex_change"] for n in back["all_nodes"])
+    assert len(svc.HISTORY.series("MEMOABA", exp)["timestamps"]) == 3
+
+    # Node dicts are charged for what they hold, not a flat estimate
+    memo = StageMemo()
+    memo.store("extract", "k", {k: v for k, v in first.items() if k != "timestamp"})
+    assert memo.stats()["bytes"] > 16 * 1024
+
+
+def test_scenario_memo_expires_as_time_to_expiry_shrinks(monkeypatch):
+    import gammamaps_service as svc
+
+    exp = "2026-10-16"
+    chain = OptionChain.from_options([
+        {"strike": 95.0, "option_type": "put", "open_interest": 100, "greeks": {"gamma": 0.05, "mid_iv": 0.2}},
+        {"strike": 103.0, "option_type": "call", "open_interest": 150, "greeks": {"gamma": 0.05, "mid_iv": 0.2}},
+    ], expiration=exp)
+    clock = [expiry_timestamp(exp) - 30 * 3600 - 30]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+
+    early = svc._nodes_from_chain("MEMOTTE", 100.0, exp, chain)["zero_gamma"]
+    hits = svc.MEMO.stats()["stages"]["scenario"]["hits"]
+    clock[0] += 10    # same minute: reused
+    assert svc._nodes_from_chain("MEMOTTE", 100.0, exp, chain)["zero_gamma"] == early
+    assert svc.MEMO.stats()["stages"]["scenario"]["hits"] == hits + 1
+    clock[0] += 24 * 3600    # a day closer to expiry: repriced
+    late = svc._nodes_from_chain("MEMOTTE", 100.0, exp, chain)["zero_gamma"]
+    assert svc.MEMO.stats()["stages"]["scenario"]["hits"] == hits + 1
+    assert late == round(svc.SCENARIOS.run(chain, 100.0, now=clock[0])["zero_gamma"], 2) != early
+
+
+def test_async_vendor_calls_wait_for_tokens_outside_the_vendor_pool(service, monkeypatch):
+    svc, client, fake = service
+    monkeypatch.setattr(data, "LIMITER", RateLimiter(rate=5.0, burst=1, max_wait=5.0))
+    vendor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(data, "_EXECUTOR", vendor)
+    expirations = ["2026-11-20", "2026-11-27", "2026-12-04"]
+    done = []
+
+    async def tracked(name, call):
+        await call
+        done.append(name)
+
+    async def run():
+        with priority(BACK):
+            backs = [asyncio.create_task(tracked(e, data.get_options_chain_async("RLIM", e)))
+                     for e in expirations]
+        await asyncio.sleep(0.05)    # the later back calls are queued for tokens
+        await tracked("spot", data.get_spot_async("RLIM"))
+        await asyncio.gather(*backs)
+
+    try:
+        asyncio.run(run())
+    finally:
+        vendor.shutdown()
+    # Queued back calls held no vendor thread, so spot went on the next token
+    assert sorted(done[-2:]) == expirations[1:]
+    assert data.LIMITER.stats()["granted"] == {"spot": 1, "front": 0, "back": 3, "background": 0}
+
+
+def test_vendor_retries_take_rate_limit_tokens(monkeypatch):
+    server, base = _serve()
+    client = VendorClient(pool_size=1, max_retries=3, backoff_factor=0)
+    limiter = RateLimiter(rate=1000.0, burst=10)
+    monkeypatch.setattr(data, "TRADIER_BASE", base)
+    monkeypatch.setattr(data, "TRADIER_TOKEN", "test")
+    monkeypatch.setattr(data, "LIMITER", limiter)
+    monkeypatch.setattr(data, "get_client", lambda: client)
+    try:
+        _StandIn.failures_left = 2
+        assert data.get_spot("RTRY") == 6000.0
+        assert limiter.stats()["granted"]["spot"] == 3    # two retried 503s + the success
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_stage_memo_reuses_outputs_for_unchanged_chains():
+    options = [
+        {"strike": 100.0, "option_type": "call", "open_interest": 10, "bid": 1.0,
+         "greeks": {"gamma": 0.05, "mid_iv": 0.2}},
+        {"strike": 95.0, "option_type": "put", "open_interest": 20, "bid": 0.5,
+         "greeks": {"gamma": 0.04, "mid_iv": 0.25}},
+    ]
+    chain = OptionChain.from_options(options, expiration="2026-10-16")
+    requoted = OptionChain.from_options([dict(o, bid=o["bid"] + 0.1) for o in options],
+                                        expiration="2026-10-16")
+    reopened = OptionChain.from_options([dict(o, open_interest=11) for o in options],
+                                        expiration="2026-10-16")
+    # Quotes do not feed the pipeline; open interest does
+    assert chain.fingerprint() == requoted.fingerprint()
+    assert chain.fingerprint() != reopened.fingerprint()
+
+    memo = StageMemo(max_entries=2, max_bytes=4096)
+    calls = []
+
+    def exposure(c):
+        calls.append(c)
+        return compute_exposure(c, 100.0)
+
+    for c in (chain, requoted, reopened):
+        memo.get_or_compute("exposure", (c.fingerprint(), 100.0), lambda: exposure(c))
+    assert calls == [chain, reopened]
+
+    memo.get_or_compute("smooth", ("k",), lambda: 1.0)    # evicts the oldest entry
+    assert memo.lookup("exposure", (chain.fingerprint(), 100.0)) == (False, None)
+    memo.store("big", ("k",), np.zeros(1024))              # over max_bytes: not kept
+    assert memo.lookup("big", ("k",)) == (False, None)
+    assert memo.get_or_compute("nothing", None, lambda: 2) == 2
+
+    stats = memo.stats()
+    assert stats["entries"] == 2
+    assert stats["stages"]["exposure"] == {"hits": 1, "misses": 3, "hit_rate": 0.25}
+    assert "nothing" not in stats["stages"]
+
+
+def test_surface_unions_strikes_and_marks_failed_expirations(service, tmp_path):
+    svc, client, fake = service
+    expirations = data.get_expirations("SURF")
+    _record_chain(tmp_path, "SURF", expirations[1], b"{not json")
+
+    surface = client.get("/surface", params={"symbol": "SURF"}).json()
+    assert surface["expirations"] == expirations
+    assert [s["available"] for s in surface["summaries"]] == [True, False, True, True]
+    assert surface["summaries"][1] == {"expiration": expirations[1], "available": False}
+    assert surface["strikes"] == sorted(surface["strikes"], reverse=True)
+
+    # Rows are the union of every available expiry's in-band strikes, and each
+    # cell is that expiry's node (None where it has none)
+    union = set()
+    for j, exp in enumerate(expirations):
+        column = {k: row[j] for k, row in zip(surface["strikes"], surface["gex"])}
+        if j == 1:
+            assert set(column.values()) == {None}
+            continue
+        nodes = client.get("/nodes", params={"symbol": "SURF", "expiration": exp}).json()
+        union.update(n["strike"] for n in nodes["all_nodes"])
+        assert {k: v for k, v in column.items() if v is not None} == {
+            n["strike"]: n["gex"] for n in nodes["all_nodes"]}
+    assert set(surface["strikes"]) == union
+    # Per-expiry results were cached by the surface build
+    assert fake.stats()["endpoints"]["chains"]["200"] == 4
+
+
+def test_tiered_refresh_archives_chains_once_per_fetch(service, monkeypatch):
+    svc, client, fake = service
+
+    class Recorder:
+        def __init__(self):
+            self.chains, self.profiles = [], []
+
+        def add_chain(self, symbol, spot, chain):
+            self.chains.append(chain.expiration)
+
+        def add_profile(self, symbol, expiration, *args):
+            self.profiles.append(expiration)
+
+    archive = Recorder()
+    monkeypatch.setattr(svc, "ARCHIVE", archive)
+    monkeypatch.setattr(svc, "TIERED", True)
+    monkeypatch.setattr(svc, "NODES_TTL_SECONDS", 1.0)
+    monkeypatch.setattr(svc, "CHAINS", TTLCache(ttl=60, stale_ttl=60))
+    monkeypatch.setattr(svc, "SPOTS", TTLCache(ttl=1, stale_ttl=0))
+
+    asyncio.run(svc._refresh_expiries("ARCH", True, 15))
+    front = data.get_expirations("ARCH")[:svc.FRONT_EXPIRIES]
+    assert sorted(archive.chains) == front and sorted(archive.profiles) == front
+    # Spot-only rebuilds reprice the held chains without archiving them again
+    for _ in range(2):
+        asyncio.run(svc._refresh_spot("ARCH", 1))
+    assert sorted(archive.chains) == front
+    assert len(archive.profiles) == 3 * len(front)
+
+
+def test_builds_reuse_the_cached_expiration_list(service, monkeypatch):
+    svc, client, fake = service
+    for _ in range(3):
+        svc.build_nodes("EXPC")
+        asyncio.run(svc.build_batch_async(["EXPC"], []))
+    asyncio.run(svc.build_surface_async("EXPC"))
+    assert fake.stats()["endpoints"]["expirations"]["200"] == 1
+
+    # Tiered node entries past their TTL are rebuilt, not served stale
+    monkeypatch.setattr(svc, "NODES_SERVE_STALE", False)
+    svc.CACHE.set("EXPC_default", Payload({"stale": True}), ttl=0.01)
+    time.sleep(0.02)
+    assert "stale" not in svc.get_cached_payload("EXPC").data
+
+
+def test_batch_isolates_symbol_and_expiration_failures(service, tmp_path):
+    svc, client, fake = service
+    expirations = data.get_expirations("BATA")
+    _record_chain(tmp_path, "BATA", expirations[1], b"{not json")
+    (tmp_path / "expirations").mkdir()
+    (tmp_path / "expirations" / "BATX.json").write_bytes(b"{not json")
+
+    body = client.get("/nodes/batch", params={
+        "symbols": "BATA,BATC,BATX",
+        "expirations": f"{expirations[0]},{expirations[1]},2099-01-02",
+    }).json()
+
+    assert sorted(body["results"]) == ["BATA", "BATC"]
+    assert list(body["results"]["BATA"]) == [expirations[0]]
+    assert list(body["results"]["BATC"]) == expirations[:2]
+    for symbol, by_exp in body["results"].items():
+        assert all(d["symbol"] == symbol and d["all_nodes"] for d in by_exp.values())
+    failed = sorted((e["symbol"], e["expiration"] or "") for e in body["errors"])
+    assert failed == sorted([("BATA", "2099-01-02"), ("BATA", expirations[1]),
+                             ("BATC", "2099-01-02"), ("BATX", "")])
+
+
+def test_async_chain_fan_out_is_bounded_and_times_out_per_call(monkeypatch):
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def fetch(symbol, expiration):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.6 if expiration == "stuck" else 0.05)
+        with lock:
+            active[0] -= 1
+        return expiration
+
+    monkeypatch.setattr(data, "get_options_chain", fetch)
+    expirations = [f"e{i}" for i in range(6)] + ["stuck"]
+    started = time.perf_counter()
+    results = asyncio.run(data.get_options_chains_async("X", expirations, concurrency=2, timeout=0.2))
+
+    assert peak[0] == 2
+    assert [results[e] for e in expirations[:-1]] == expirations[:-1]
+    # One call hitting its deadline fails alone, without waiting for its thread
+    assert isinstance(results["stuck"], asyncio.TimeoutError)
+    assert time.perf_counter() - started < 0.55
+
+    async def cancelled():
+        task = asyncio.ensure_future(data.get_options_chains_async("X", ["stuck"]))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await task
+
+    # Cancelling the caller propagates instead of becoming a per-chain result
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(cancelled())
+
+
+def test_scheduler_skips_ticks_while_running_and_reports_status():
+    started = []
+
+    async def slow():
+        started.append(time.monotonic())
+        await asyncio.sleep(0.25)
+
+    async def failing():
+        raise RuntimeError("vendor down")
+
+    async def main():
+        scheduler = RefreshScheduler(jitter=0)
+        scheduler.add_job("slow", 0.1, slow)
+        scheduler.add_job("bad", 0.1, failing)
+        scheduler.start()
+        await asyncio.sleep(0.15)
+        during = scheduler.status()
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+        return during, scheduler.status()
+
+    during, after = asyncio.run(main())
+    assert during["slow"]["running"] and during["slow"]["skips"] == 1
+    assert during["slow"]["last_finished"] is None
+    # The 0.1 and 0.2 ticks were skipped, not queued; 0.3 started a new run
+    assert len(started) == 2 and started[1] - started[0] >= 0.25
+    assert after["slow"]["skips"] == 2 and after["slow"]["interval"] == 0.1
+    assert not after["slow"]["running"]
+    assert after["bad"]["failures"] == after["bad"]["runs"] >= 3
+    assert after["bad"]["last_error"] == "vendor down"
+
+
+def test_stale_hits_schedule_one_revalidation_per_key():
+    import gammamaps_service as svc
+
+    key = "REVAL_default"
+    svc.CACHE.set(key, Payload({"v": 0}), ttl=0.01)
+    time.sleep(0.02)
+    release, builds = threading.Event(), []
+
+    def build():
+        builds.append(1)
+        release.wait(2)
+        return {"v": len(builds)}
+
+    coalesced = svc.FLIGHTS.stats()["coalesced"]
+    try:
+        for _ in range(5):
+            assert svc._cached(key, build).data == {"v": 0}    # stale value served
+
+        async def burst():
+            async def abuild():
+                return build()
+            for _ in range(5):
+                assert (await svc._cached_async(key, abuild)).data == {"v": 0}
+
+        asyncio.run(burst())
+    finally:
+        release.set()
+    deadline = time.time() + 2
+    while key in svc._REVALIDATING and time.time() < deadline:
+        time.sleep(0.01)
+    assert builds == [1] and key not in svc._REVALIDATING
+    assert svc.FLIGHTS.stats()["coalesced"] == coalesced
+    assert svc.CACHE.lookup(key, record=False)[0].data == {"v": 1}
+    svc.CACHE.delete(key)
+
+
+def test_payload_etag_ignores_build_timestamps():
+    first = Payload({"symbol": "SPX", "timestamp": 1, "results": {"SPX": {"timestamp": 1, "gex": [1.5]}}})
+    rebuilt = Payload({"symbol": "SPX", "timestamp": 2, "results": {"SPX": {"timestamp": 2, "gex": [1.5]}}})
+    changed = Payload({"symbol": "SPX", "timestamp": 2, "results": {"SPX": {"timestamp": 2, "gex": [2.5]}}})
+    assert first.etag == rebuilt.etag != changed.etag
+    # Bodies sharing a tag differ in their timestamps, so the tags are weak
+    assert first.etag.startswith('W/"') and first.gzip_etag == first.etag[:-1] + '-gzip"'
+    opaque = first.gzip_etag[2:]
+    assert first.matches(f'{opaque}, "other"') and not first.matches('W/"other"')
+
+
+def test_nodes_etag_304_and_gzip(service, monkeypatch):
+    svc, client, fake = service
+    monkeypatch.setattr(svc, "GZIP_MIN_BYTES", 0)
+    monkeypatch.setattr(svc, "get_spot", lambda symbol: 100.0)
+    params = {"symbol": "ETAG"}
+
+    plain = client.get("/nodes", params=params, headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200 and "Content-Encoding" not in plain.headers
+    assert plain.headers["Vary"] == "Accept-Encoding"
+    etag = plain.headers["ETag"]
+
+    zipped = client.get("/nodes", params=params, headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert etag.startswith('W/"') and zipped.headers["ETag"] == etag[:-1] + '-gzip"'
+    assert zipped.json() == plain.json()
+
+    for tag, encoding in ((etag, "identity"), (zipped.headers["ETag"], "gzip")):
+        resp = client.get("/nodes", params=params,
+                          headers={"If-None-Match": tag, "Accept-Encoding": encoding})
+        assert resp.status_code == 304 and resp.content == b""
+        assert resp.headers["Vary"] == "Accept-Encoding"
+
+    # A rebuild of unchanged inputs later on still validates
+    svc.CACHE.delete("ETAG_default")
+    time.sleep(1.0)
+    resp = client.get("/nodes", params=params,
+                      headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert resp.status_code == 304
+    assert svc.CACHE.get("ETAG_default").data["timestamp"] > plain.json()["timestamp"]